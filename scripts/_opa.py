@@ -0,0 +1,122 @@
+"""
+Long-running OPA server for the Rego verifiers.
+
+`OpaServer` starts `opa run --server` on a free local port and checks Rego
+over its REST API: each policy is PUT under /v1/policies (a 400 there is a
+parse/compile error), evaluated with a POST to /v1/data and deleted again.
+That keeps fork/exec and OPA start-up out of the per-policy loop.
+
+Every policy is loaded under its own package prefix so unrelated examples
+that reuse a package name (`package git`, ...) never conflict.
+"""
+
+import http.client
+import itertools
+import json
+import re
+import socket
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+_PACKAGE_RE = re.compile(r'^package\s+', re.MULTILINE)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _error_text(body: Dict) -> str:
+    """OPA's error response as one line per error, like the CLI prints them"""
+    errors = body.get("errors") or []
+    if not errors:
+        return body.get("message", "unknown error")
+    lines = []
+    for err in errors:
+        row = (err.get("location") or {}).get("row")
+        where = f"{row}: " if row else ""
+        lines.append(f"{where}{err.get('code')}: {err.get('message')}")
+    return "\n".join(lines)
+
+
+class OpaServer:
+    """`opa run --server` for the lifetime of a with-block"""
+
+    def __init__(self, startup_timeout: float = 10.0):
+        self.port = _free_port()
+        self.startup_timeout = startup_timeout
+        self.proc: Optional[subprocess.Popen] = None
+        self._local = threading.local()
+        self._ids = itertools.count()
+
+    def __enter__(self) -> "OpaServer":
+        self.proc = subprocess.Popen(
+            ['opa', 'run', '--server', '--addr', f'127.0.0.1:{self.port}', '--log-level', 'error'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.proc.poll() is not None:
+                break
+            try:
+                if self._request('GET', '/health')[0] == 200:
+                    return self
+            except OSError:
+                pass
+            time.sleep(0.05)
+        self.__exit__(None, None, None)
+        raise RuntimeError("opa server did not start")
+
+    def __exit__(self, *exc):
+        if self.proc is not None:
+            self.proc.terminate()
+            self.proc.wait()
+            self.proc = None
+
+    def _request(self, method: str, path: str, body: Optional[str] = None) -> Tuple[int, Dict]:
+        # One keep-alive connection per thread; HTTPConnection isn't thread-safe
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection('127.0.0.1', self.port)
+        try:
+            conn.request(method, path, body=body)
+            response = conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+        return response.status, json.loads(data) if data else {}
+
+    def evaluate(self, rego_code: str, input_data: Dict) -> Tuple[bool, str, Optional[Dict]]:
+        """Load rego_code, evaluate its package on input_data and unload it again
+
+        Returns (ok, message, result); message is "Syntax error: ..." or
+        "Eval error: ..." when not ok.
+        """
+        prefix = f"p{next(self._ids)}"
+        rego_code = _PACKAGE_RE.sub(f'package {prefix}.', rego_code, count=1)
+
+        status, body = self._request('PUT', f'/v1/policies/{prefix}', rego_code)
+        if status != 200:
+            return False, f"Syntax error: {_error_text(body)}", None
+
+        try:
+            status, body = self._request('POST', f'/v1/data/{prefix}', json.dumps({"input": input_data}))
+            if status != 200:
+                return False, f"Eval error: {_error_text(body)}", None
+            return True, "Valid", body.get("result")
+        finally:
+            self._request('DELETE', f'/v1/policies/{prefix}')
+
+    def verify(self, rego_code: str) -> Tuple[bool, str]:
+        """Same verdict as verify_rego_syntax: compiles and evaluates on {}"""
+        ok, msg, _ = self.evaluate(rego_code, {})
+        return ok, msg
+
+    def verify_batch(self, rego_codes: List[str]) -> List[Tuple[bool, str]]:
+        return [self.verify(rego_code) for rego_code in rego_codes]
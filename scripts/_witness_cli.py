@@ -0,0 +1,204 @@
+"""
+Shared helpers for scripts that query the witness CLI.
+
+`list_attestors` parses the name column of `witness attestors list`,
+`schema` returns the JSON schema of one attestor and `fields` flattens it to
+{field: {'type': ..., 'required': ...}}. All three are memoized per process,
+as is the markdown overview from `render_field_list`.
+
+Attestor schemas rarely change between runs, so `schema` also keeps
+each `witness attestors schema <name>` result under
+~/.cache/witness-evals/schemas/<witness-version-hash>/<name>.json and only
+re-runs witness when the binary is newer than the cached file.
+`get_attestor_schemas` additionally keeps every schema of a run in one
+index.json next to them, attestors without a schema included, so a warm run
+resolves all attestors with a single file read and no per-attestor witness
+processes (only the `witness version` call that keys the cache).
+"""
+
+import functools
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# First table cell of a `witness attestors list` row, minus any "(default)" /
+# "(always run)" marker
+_ATTESTOR_ROW = re.compile(r'^\s*\|\s*([A-Za-z0-9_\-]+)(?:\s*\([^)]*\))?\s*\|')
+
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "witness-evals" / "schemas"
+
+
+@functools.lru_cache(maxsize=1)
+def _attestor_names() -> Tuple[str, ...]:
+    result = subprocess.run(["witness", "attestors", "list"], capture_output=True, text=True)
+    return tuple(
+        m.group(1)
+        for m in map(_ATTESTOR_ROW.match, result.stdout.splitlines())
+        if m and m.group(1) != 'NAME'
+    )
+
+
+def list_attestors() -> List[str]:
+    """Get list of all attestors from witness"""
+    return list(_attestor_names())
+
+
+@functools.lru_cache(maxsize=1)
+def witness_version() -> str:
+    """Version string reported by `witness version` ("unknown" if unavailable)"""
+    try:
+        result = subprocess.run(["witness", "version"], capture_output=True, text=True)
+    except OSError:
+        return "unknown"
+    return (result.stdout or result.stderr).strip() or "unknown"
+
+
+def _witness_mtime() -> float:
+    path = shutil.which("witness")
+    if path is None:
+        return 0.0
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0.0
+
+
+def _version_dir() -> Path:
+    return CACHE_DIR / hashlib.sha1(witness_version().encode()).hexdigest()[:12]
+
+
+def _read_fresh(path: Path):
+    """Parsed JSON at path if it is newer than the witness binary, else None"""
+    try:
+        if path.stat().st_mtime > _witness_mtime():
+            return json.loads(path.read_text())
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _write_atomic(path: Path, obj) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(obj))
+    os.replace(tmp, path)
+
+
+def disk_cached_schema(fn):
+    """Cache an attestor -> schema function on disk, keyed by witness version"""
+    @functools.wraps(fn)
+    def wrapper(attestor):
+        path = _version_dir() / f"{attestor}.json"
+        schema = _read_fresh(path)
+        if schema is not None:
+            return schema
+
+        schema = fn(attestor)
+        if schema is not None:
+            _write_atomic(path, schema)
+        return schema
+
+    return wrapper
+
+
+@functools.lru_cache(maxsize=None)
+@disk_cached_schema
+def schema(attestor: str) -> Optional[Dict]:
+    """JSON schema for an attestor, or None if witness has none"""
+    result = subprocess.run(["witness", "attestors", "schema", attestor], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    try:
+        return json.loads(result.stdout)
+    except ValueError:
+        return None
+
+
+def extract_fields(attestor_schema: Optional[Dict]) -> Dict[str, Dict]:
+    """Extract field names, types, and required status from JSON schema"""
+    if not attestor_schema or '$defs' not in attestor_schema:
+        return {}
+
+    # Main definition is the only one, or the one named after the attestor
+    defs = attestor_schema['$defs']
+    if len(defs) == 1:
+        main_def = next(iter(defs.values()))
+    else:
+        main_def = next((v for k, v in defs.items() if 'Attestor' in k), None)
+
+    if not main_def or 'properties' not in main_def:
+        return {}
+
+    fields = {}
+    required = set(main_def.get('required', ()))
+
+    for field_name, field_def in main_def['properties'].items():
+        try:
+            ref = field_def.get('$ref')
+        except AttributeError:
+            # Boolean field_def (additionalProperties: true/false)
+            continue
+
+        if ref:
+            field_type = ref.rsplit('/', 1)[-1]
+        else:
+            field_type = field_def.get('type', 'unknown')
+            if field_type == 'array':
+                items = field_def.get('items')
+                if isinstance(items, dict):
+                    field_type = f"array of {items.get('type', 'object')}"
+
+        fields[field_name] = {'type': field_type, 'required': field_name in required}
+
+    return fields
+
+
+@functools.lru_cache(maxsize=None)
+def fields(attestor: str) -> Dict[str, Dict]:
+    """Fields of an attestor's schema (empty if it has no schema)"""
+    return extract_fields(schema(attestor))
+
+
+@functools.lru_cache(maxsize=256)
+def _render_field_list(key: Tuple[Tuple[str, str, bool], ...], name_mark: str, required_mark: str) -> str:
+    return "\n".join(
+        f"- {name_mark}{name}{name_mark} ({field_type}){required_mark if required else ''}"
+        for name, field_type, required in key
+    )
+
+
+def render_field_list(fields: Dict[str, Dict], name_mark: str = "`", required_mark: str = "  **required**") -> str:
+    """Markdown bullet list of fields, one `- name (type)` line per field"""
+    key = tuple((name, info['type'], info['required']) for name, info in fields.items())
+    return _render_field_list(key, name_mark, required_mark)
+
+
+def get_attestor_schemas(attestors: Iterable[str],
+                         fetch: Callable[[str], Optional[Dict]] = schema,
+                         max_workers: int = 16) -> Dict[str, Optional[Dict]]:
+    """Schemas for all attestors as one {name: schema} dict
+
+    Served from the index.json of the current witness version when it covers
+    every attestor; otherwise only the missing ones go through fetch
+    (concurrently, since each is a witness subprocess) and the index is
+    rewritten. Attestors without a schema are stored as null so they are not
+    fetched again.
+    """
+    attestors = list(attestors)
+    path = _version_dir() / "index.json"
+    index = _read_fresh(path) or {}
+
+    missing = [a for a in attestors if a not in index]
+    if missing:
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            fetched = dict(zip(missing, ex.map(fetch, missing)))
+        index.update(fetched)
+        _write_atomic(path, index)
+
+    return {a: index.get(a) for a in attestors}
@@ -102,138 +102,160 @@ class VerifiedExampleGenerator:
 
     def generate_example(self, example_num: int, attestors: List[str]) -> bool:
         """Generate a single verified example"""
+        try:
+            training_example = self.build_example(example_num, attestors)
+        except Exception as e:
+            self.fail_count += 1
+            return False
+
+        if training_example is None:
+            return False
+
+        # Append to JSONL file
+        with open(self.output_file, 'a') as f:
+            f.write(json.dumps(training_example) + '\n')
+
+        self.success_count += 1
+        return True
+
+    def build_example(self, example_num: int, attestors: List[str],
+                      step_name: str = "build", question: Optional[str] = None,
+                      command: Optional[str] = None) -> Optional[dict]:
+        """Run the witness pipeline and return the training example, or None if verification fails"""
         with tempfile.TemporaryDirectory() as tmpdir:
             work_dir = Path(tmpdir)
-            step_name = "build"
-
-            try:
-                # Step 1: Create keys
-                key_pem, key_pub = self.create_keys(work_dir)
-
-                # Step 2: Init git if needed
-                if "git" in attestors:
-                    self.init_git_repo(work_dir)
-
-                # Step 3: Set environment variables if needed
-                env = os.environ.copy()
-                if "environment" in attestors:
-                    env["CI"] = "true"
-                    env["BUILD_ID"] = str(example_num)
-
-                # Step 4: Create material file if needed
-                if "material" in attestors:
-                    material_file = work_dir / "input.txt"
-                    material_file.write_text("source data\n")
-
-                # Step 5: Run witness attestation (creates artifact)
-                artifact = work_dir / "output.txt"
-                att_file = work_dir / "build.att"
-                attestor_str = ",".join(attestors)
-
-                # CRITICAL: Delete output.txt if exists (product attestor only captures NEW files)
-                if artifact.exists():
-                    artifact.unlink()
-
-                # Build command based on whether material file exists
-                if "material" in attestors:
-                    bash_cmd = f"cat {work_dir}/input.txt > {artifact}"
-                else:
-                    bash_cmd = f"echo 'Building...' > {artifact}"
-
-                success, stdout, stderr = self.run_command([
-                    "witness", "run",
-                    "--step", step_name,
-                    "--signer-file-key-path", str(key_pem),
-                    "--outfile", str(att_file),
-                    "--attestations", attestor_str,
-                    "--",
-                    "bash", "-c", bash_cmd
-                ], work_dir, env=env)
-
-                if not success:
-                    return False
-
-                # Step 6: Extract key ID from attestation
-                with open(att_file, 'r') as f:
-                    att_data = json.load(f)
-
-                key_id = att_data['signatures'][0]['keyid']
-
-                # Step 7: Create policy
-                with open(key_pub, 'rb') as f:
-                    pub_key_b64 = base64.b64encode(f.read()).decode('ascii')
-
-                attestation_types = [
-                    {"type": f"https://witness.dev/attestations/{att}/v0.1"}
-                    for att in attestors
-                ]
 
-                policy = {
-                    "expires": "2026-12-31T23:59:59Z",
-                    "steps": {
-                        step_name: {
-                            "name": step_name,
-                            "attestations": attestation_types,
-                            "functionaries": [
-                                {
-                                    "type": "publickey",
-                                    "publickeyid": key_id
-                                }
-                            ]
-                        }
-                    },
-                    "publickeys": {
-                        key_id: {
-                            "keyid": key_id,
-                            "key": pub_key_b64
-                        }
+            # Step 1: Create keys
+            key_pem, key_pub = self.create_keys(work_dir)
+
+            # Step 2: Init git if needed
+            if "git" in attestors:
+                self.init_git_repo(work_dir)
+
+            # Step 3: Set environment variables if needed
+            env = os.environ.copy()
+            if "environment" in attestors:
+                env["CI"] = "true"
+                env["BUILD_ID"] = str(example_num)
+
+            # Step 4: Create material file if needed (the material attestor or
+            # the command reads it)
+            needs_input = "material" in attestors or bool(command and "input.txt" in command)
+            if needs_input:
+                material_file = work_dir / "input.txt"
+                material_file.write_text("source data\n")
+
+            # Step 5: Run witness attestation (creates artifact)
+            artifact = work_dir / "output.txt"
+            att_file = work_dir / "build.att"
+            attestor_str = ",".join(attestors)
+
+            # CRITICAL: Delete output.txt if exists (product attestor only captures NEW files)
+            if artifact.exists():
+                artifact.unlink()
+
+            # Build command based on whether material file exists
+            if command:
+                bash_cmd = command
+            elif "material" in attestors:
+                bash_cmd = f"cat {work_dir}/input.txt > {artifact}"
+            else:
+                bash_cmd = f"echo 'Building...' > {artifact}"
+
+            success, stdout, stderr = self.run_command([
+                "witness", "run",
+                "--step", step_name,
+                "--signer-file-key-path", str(key_pem),
+                "--outfile", str(att_file),
+                "--attestations", attestor_str,
+                "--",
+                "bash", "-c", bash_cmd
+            ], work_dir, env=env)
+
+            if not success:
+                return None
+
+            # Step 6: Extract key ID from attestation
+            with open(att_file, 'r') as f:
+                att_data = json.load(f)
+
+            key_id = att_data['signatures'][0]['keyid']
+
+            # Step 7: Create policy
+            with open(key_pub, 'rb') as f:
+                pub_key_b64 = base64.b64encode(f.read()).decode('ascii')
+
+            attestation_types = [
+                {"type": f"https://witness.dev/attestations/{att}/v0.1"}
+                for att in attestors
+            ]
+
+            policy = {
+                "expires": "2026-12-31T23:59:59Z",
+                "steps": {
+                    step_name: {
+                        "name": step_name,
+                        "attestations": attestation_types,
+                        "functionaries": [
+                            {
+                                "type": "publickey",
+                                "publickeyid": key_id
+                            }
+                        ]
+                    }
+                },
+                "publickeys": {
+                    key_id: {
+                        "keyid": key_id,
+                        "key": pub_key_b64
                     }
                 }
-
-                policy_file = work_dir / "policy.json"
-                with open(policy_file, 'w') as f:
-                    json.dump(policy, f, indent=2)
-
-                # Step 8: Sign policy
-                policy_signed = work_dir / "policy-signed.json"
-                success, stdout, stderr = self.run_command([
-                    "witness", "sign",
-                    "--signer-file-key-path", str(key_pem),
-                    "--infile", str(policy_file),
-                    "--outfile", str(policy_signed)
-                ], work_dir)
-
-                if not success:
-                    return False
-
-                # Step 9: VERIFY with witness verify
-                success, stdout, stderr = self.run_command([
-                    "witness", "verify",
-                    "--policy", str(policy_signed),
-                    "--publickey", str(key_pub),
-                    "--attestations", str(att_file),
-                    "-f", str(artifact)
-                ], work_dir)
-
-                # Check if verification actually passed
-                # NOTE: witness writes all output to stderr, so only check returncode
-                if not success:
-                    return False
-
-                # Double-check for verification success message
-                if "Verification succeeded" not in stderr:
-                    return False
-
-                # Step 10: Verification PASSED! Create training example
-                attestor_list = ", ".join(attestors)
-                policy_json = json.dumps(policy, indent=2)
-
-                # Build setup sections based on attestors
-                setup_sections = []
-
-                # Git setup if needed
-                if "git" in attestors:
-                    setup_sections.append("""**Setup Git Repository:**
+            }
+
+            policy_file = work_dir / "policy.json"
+            with open(policy_file, 'w') as f:
+                json.dump(policy, f, indent=2)
+
+            # Step 8: Sign policy
+            policy_signed = work_dir / "policy-signed.json"
+            success, stdout, stderr = self.run_command([
+                "witness", "sign",
+                "--signer-file-key-path", str(key_pem),
+                "--infile", str(policy_file),
+                "--outfile", str(policy_signed)
+            ], work_dir)
+
+            if not success:
+                return None
+
+            # Step 9: VERIFY with witness verify
+            success, stdout, stderr = self.run_command([
+                "witness", "verify",
+                "--policy", str(policy_signed),
+                "--publickey", str(key_pub),
+                "--attestations", str(att_file),
+                "-f", str(artifact)
+            ], work_dir)
+
+            # Check if verification actually passed
+            # NOTE: witness writes all output to stderr, so only check returncode
+            if not success:
+                return None
+
+            # Double-check for verification success message
+            if "Verification succeeded" not in stderr:
+                return None
+
+            # Step 10: Verification PASSED! Create training example
+            attestor_list = ", ".join(attestors)
+            policy_json = json.dumps(policy, indent=2)
+
+            # Build setup sections based on attestors
+            setup_sections = []
+
+            # Git setup if needed
+            if "git" in attestors:
+                setup_sections.append("""**Setup Git Repository:**
 ```bash
 git init
 git config user.email "test@example.com"
@@ -244,41 +266,48 @@ git commit -m "initial commit"
 ```
 """)
 
-                # Environment setup if needed
-                if "environment" in attestors:
-                    setup_sections.append("""**Set Environment Variables:**
+            # Environment setup if needed
+            if "environment" in attestors:
+                setup_sections.append("""**Set Environment Variables:**
 ```bash
 export CI=true
 export BUILD_ID=12345
 ```
 """)
 
-                # Material file if needed
-                if "material" in attestors:
-                    setup_sections.append("""**Create Material File:**
+            # Material file if needed
+            if needs_input:
+                setup_sections.append("""**Create Material File:**
 ```bash
 echo "source data" > input.txt
 ```
 """)
-                    training_bash_cmd = "cat input.txt > output.txt"
-                else:
-                    training_bash_cmd = "echo 'Building...' > output.txt"
-
-                setup_text = "".join(setup_sections)
-
-                training_example = {
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": SYSTEM_PROMPT
-                        },
-                        {
-                            "role": "user",
-                            "content": f"How do I create a complete witness configuration for a {step_name} step with {attestor_list} attestors that passes verification?"
-                        },
-                        {
-                            "role": "assistant",
-                            "content": f"""Here's a complete, verified witness configuration:
+            if "material" in attestors:
+                training_bash_cmd = "cat input.txt > output.txt"
+            else:
+                training_bash_cmd = "echo 'Building...' > output.txt"
+            if command:
+                # Rendered inside bash -c "...", so escape embedded double quotes
+                training_bash_cmd = command.replace('"', '\\"')
+
+            if question is None:
+                question = f"How do I create a complete witness configuration for a {step_name} step with {attestor_list} attestors that passes verification?"
+
+            setup_text = "".join(setup_sections)
+
+            training_example = {
+                "messages": [
+                    {
+                        "role": "system",
+                        "content": SYSTEM_PROMPT
+                    },
+                    {
+                        "role": "user",
+                        "content": question
+                    },
+                    {
+                        "role": "assistant",
+                        "content": f"""Here's a complete, verified witness configuration:
 
 **1. Generate Ed25519 Keys:**
 ```bash
@@ -323,20 +352,11 @@ witness verify \\
 ```
 
 This configuration has been formally verified to pass witness verify."""
-                        }
-                    ]
-                }
-
-                # Append to JSONL file
-                with open(self.output_file, 'a') as f:
-                    f.write(json.dumps(training_example) + '\n')
-
-                self.success_count += 1
-                return True
+                    }
+                ]
+            }
 
-            except Exception as e:
-                self.fail_count += 1
-                return False
+            return training_example
 
     def generate_dataset(self, target: int = 10000):
         """Generate target number of verified examples"""
@@ -11,14 +11,11 @@ This creates maximum diversity to improve model generalization.
 """
 
 import sys
-import os
+from itertools import product
 
-# Import from the working verified generator
-sys.path.insert(0, '/Users/nkennedy/proj/witness-evals/scripts')
-from generate_10k_verified import VerifiedExampleGenerator
-
-# Expanded attestor combinations for maximum diversity
-DIVERSE_ATTESTOR_COMBINATIONS = [
+# Hand-curated candidate pool of attestor combinations. Contains some
+# permutations of the same set; select_diverse_combinations() below drops them.
+CANDIDATE_ATTESTOR_COMBINATIONS = [
     # Basic single attestors (5 examples)
     ["environment"],
     ["git"],
@@ -171,6 +168,58 @@ DIVERSE_ATTESTOR_COMBINATIONS = [
     ["slsa", "environment", "material", "product"],
 ]
 
+
+def attestor_masks(combos):
+    """Encode each combination as an int bitmask over a canonical attestor index."""
+    index = {}
+    for combo in combos:
+        for att in combo:
+            index.setdefault(att, len(index))
+    return [sum(1 << index[att] for att in set(combo)) for combo in combos]
+
+
+def jaccard_distance(a: int, b: int) -> float:
+    """Jaccard distance between two attestor bitmasks (popcount of AND / OR)."""
+    return 1.0 - (a & b).bit_count() / (a | b).bit_count()
+
+
+def select_diverse_combinations(candidates, target=None):
+    """Greedy max-min Jaccard selection over `candidates`.
+
+    Each step picks the candidate farthest from everything already chosen.
+    Selection stops at `target` picks or once no candidate adds anything new
+    (distance 0), so permutations of an already chosen set are never picked.
+    Ties keep the first candidate, making the result deterministic.
+    """
+    masks = attestor_masks(candidates)
+    # Distance from each candidate to its nearest chosen combination
+    nearest = [1.0] * len(masks)
+    chosen = []
+    remaining = set(range(len(masks)))
+    while remaining and (target is None or len(chosen) < target):
+        best = min(remaining, key=lambda i: (-nearest[i], i))
+        if nearest[best] == 0.0:
+            break
+        chosen.append(candidates[best])
+        remaining.discard(best)
+        picked = masks[best]
+        for i in remaining:
+            d = jaccard_distance(masks[i], picked)
+            if d < nearest[i]:
+                nearest[i] = d
+    return chosen
+
+
+# Expanded attestor combinations for maximum diversity
+DIVERSE_ATTESTOR_COMBINATIONS = select_diverse_combinations(CANDIDATE_ATTESTOR_COMBINATIONS)
+
+# Canonicalize: one sorted entry per attestor set, so permutations never
+# reach downstream generation as separate combinations
+_seen = {}
+for _combo in DIVERSE_ATTESTOR_COMBINATIONS:
+    _seen.setdefault(frozenset(_combo), sorted(_combo))
+DIVERSE_ATTESTOR_COMBINATIONS = list(_seen.values())
+
 # Step name variations for diversity
 STEP_NAMES = [
     "build",
@@ -194,9 +243,19 @@ COMMAND_PATTERNS = [
     ['sh', '-c', 'echo "Package created" > output.txt'],
 ]
 
-print(f"Total attestor combinations: {len(DIVERSE_ATTESTOR_COMBINATIONS)}")
-print(f"Step name variations: {len(STEP_NAMES)}")
-print(f"Command patterns: {len(COMMAND_PATTERNS)}")
-print(f"Total possible variations: {len(DIVERSE_ATTESTOR_COMBINATIONS) * len(STEP_NAMES) * len(COMMAND_PATTERNS)}")
-print()
-print("This provides massive diversity for training!")
+
+def iter_variations():
+    """Lazily yield (attestors, step, command) tuples for every variation."""
+    return product(DIVERSE_ATTESTOR_COMBINATIONS, STEP_NAMES, COMMAND_PATTERNS)
+
+
+if __name__ == "__main__":
+    sys.stdout.write("\n".join([
+        f"Total attestor combinations: {len(DIVERSE_ATTESTOR_COMBINATIONS)}",
+        f"Step name variations: {len(STEP_NAMES)}",
+        f"Command patterns: {len(COMMAND_PATTERNS)}",
+        f"Total possible variations: {len(DIVERSE_ATTESTOR_COMBINATIONS) * len(STEP_NAMES) * len(COMMAND_PATTERNS)}",
+        "",
+        "This provides massive diversity for training!",
+        "",
+    ]))
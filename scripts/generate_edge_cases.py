@@ -12,11 +12,27 @@ Edge cases:
 - Encoding issues
 """
 
+import io
 import json
+import os
 from pathlib import Path
+from typing import Final
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
 
 SYSTEM_PROMPT = """You are an expert in the Witness supply chain attestation framework. You help users instrument CI/CD pipelines with witness, create policy documents, and write Rego policies to validate attestations. You understand all attestors in go-witness and how to use them effectively."""
 
+# Encoded row prefix up to and including the system message, shared by every row
+_SYSTEM_PREFIX = b'{"messages":[' + _dumps({"role": "system", "content": SYSTEM_PROMPT}) + b','
+
+# Rego snippets shared by the answer templates
+BRANCH_REGEX_REGO: Final = "regex.match(`^[a-zA-Z0-9/_-]+$`, name)"
+
 EDGE_CASES = [
     {
         "case": "empty_commit_message",
@@ -237,7 +253,7 @@ import rego.v1
 
 # Allow alphanumeric and hyphens/underscores
 valid_branch_name(name) if {
-    regex.match(`^[a-zA-Z0-9/_-]+$`, name)
+    """ + BRANCH_REGEX_REGO + """
 }
 
 deny contains msg if {
@@ -282,9 +298,22 @@ def main():
             ]
         })
 
-    with open(output_file, 'w') as f:
-        for ex in examples:
-            f.write(json.dumps(ex) + '\n')
+    # Write to a temp file and rename, so an interrupted run never leaves a partial output
+    tmp_file = output_file.with_suffix(output_file.suffix + ".tmp")
+    try:
+        with open(tmp_file, 'wb', buffering=0) as raw, io.BufferedWriter(raw, buffer_size=64 * 1024) as f:
+            for ex in examples:
+                # messages[0] is always the system message: splice in its cached encoding
+                _, user_msg, assistant_msg = ex["messages"]
+                f.write(_SYSTEM_PREFIX)
+                f.write(_dumps(user_msg))
+                f.write(b",")
+                f.write(_dumps(assistant_msg))
+                f.write(b"]}\n")
+        os.replace(tmp_file, output_file)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
 
     print(f"✓ Generated {len(examples)} edge case examples")
     print(f"  Output: {output_file}")
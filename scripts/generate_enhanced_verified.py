@@ -19,34 +19,43 @@ import os
 import sys
 import random
 import base64
+import functools
+from itertools import chain, combinations, islice, product
 from pathlib import Path
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
 
 # Use the base generator from the working 10K version
 sys.path.insert(0, str(Path(__file__).parent))
+from generate_10k_verified import VerifiedExampleGenerator
+
+DEFAULT_OUTPUT = Path(__file__).parent.parent / "data" / "verified" / "enhanced_train.jsonl"
 
 SYSTEM_PROMPT = """You are an expert in the Witness supply chain attestation framework. You help users instrument CI/CD pipelines with witness, create policy documents, and write Rego policies to validate attestations. You understand all attestors in go-witness and how to use them effectively."""
 
 # Safe attestors (no mocking needed)
 SAFE_ATTESTORS = ["git", "environment", "material", "product", "file"]
 
-# Generate all combinations
-ATTESTOR_COMBINATIONS = []
-for att in SAFE_ATTESTORS:
-    ATTESTOR_COMBINATIONS.append([att])
-for i, att1 in enumerate(SAFE_ATTESTORS):
-    for att2 in SAFE_ATTESTORS[i+1:]:
-        ATTESTOR_COMBINATIONS.append(sorted([att1, att2]))
-for i, att1 in enumerate(SAFE_ATTESTORS):
-    for j, att2 in enumerate(SAFE_ATTESTORS[i+1:], i+1):
-        for att3 in SAFE_ATTESTORS[j+1:]:
-            ATTESTOR_COMBINATIONS.append(sorted([att1, att2, att3]))
-for i, att1 in enumerate(SAFE_ATTESTORS):
-    for j, att2 in enumerate(SAFE_ATTESTORS[i+1:], i+1):
-        for k, att3 in enumerate(SAFE_ATTESTORS[j+1:], j+1):
-            for att4 in SAFE_ATTESTORS[k+1:]:
-                ATTESTOR_COMBINATIONS.append(sorted([att1, att2, att3, att4]))
-ATTESTOR_COMBINATIONS.append(SAFE_ATTESTORS)
+
+def iter_attestor_combos(limit=None):
+    """Lazily yield attestor combinations (singles through the full set).
+
+    Combinations of a sorted input come out already sorted, so no per-combo
+    sort is needed. Stops after `limit` combinations when given.
+    """
+    combos = chain.from_iterable(
+        combinations(sorted(SAFE_ATTESTORS), r)
+        for r in range(1, len(SAFE_ATTESTORS) + 1)
+    )
+    for combo in islice(combos, limit):
+        yield list(combo)
+
+
+@functools.cache
+def get_attestor_combinations() -> List[List[str]]:
+    """All attestor combinations, built on first use and cached."""
+    return list(iter_attestor_combos())
+
 
 STEP_NAMES = [
     "build", "test", "package", "deploy", "scan",
@@ -71,12 +80,116 @@ COMMAND_PATTERNS = [
     'echo "Processing..." > output.txt',
 ]
 
-print(f"Enhanced Diversity Statistics:")
-print(f"  Attestor combinations: {len(ATTESTOR_COMBINATIONS)}")
-print(f"  Step names: {len(STEP_NAMES)}")
-print(f"  Question templates: {len(USER_QUESTION_TEMPLATES)}")
-print(f"  Command patterns: {len(COMMAND_PATTERNS)}")
-print(f"  Total variations: {len(ATTESTOR_COMBINATIONS) * len(STEP_NAMES) * len(USER_QUESTION_TEMPLATES) * len(COMMAND_PATTERNS):,}")
-print()
-print("This will be integrated into the verified generator...")
-print("Run with: python3 scripts/generate_10k_verified.py --target 20000 --use-diversity")
+
+def iter_variations():
+    """Lazily yield (attestors, step, template, command) tuples for every variation."""
+    return product(get_attestor_combinations(), STEP_NAMES, USER_QUESTION_TEMPLATES, COMMAND_PATTERNS)
+
+
+# One generator per worker process, set up by _init_worker
+_generator: Optional[VerifiedExampleGenerator] = None
+
+
+def _init_worker(output_file: Path):
+    global _generator
+    _generator = VerifiedExampleGenerator(output_file)
+
+
+def gen_one(job) -> Optional[dict]:
+    """Run the verified witness pipeline for one (index, attestors, step, question, command) job."""
+    example_num, attestors, step, question, command = job
+    try:
+        return _generator.build_example(example_num, attestors, step_name=step,
+                                        question=question, command=command)
+    except (subprocess.SubprocessError, OSError):
+        # A witness/openssl step failed or left no attestation behind
+        return None
+
+
+def iter_jobs(target: int):
+    """Yield `target` numbered jobs, cycling through the variations as needed.
+
+    Same order as iter_variations(), but each attestor list is joined once and
+    each question rendered once rather than per command pattern. Only the
+    attestor combinations needed to reach `target` are enumerated.
+    """
+    per_combo = len(STEP_NAMES) * len(USER_QUESTION_TEMPLATES) * len(COMMAND_PATTERNS)
+    limit = -(-target // per_combo)
+    count = 0
+    while True:
+        for attestors in iter_attestor_combos(limit):
+            a_str = ", ".join(attestors)
+            for step in STEP_NAMES:
+                for template in USER_QUESTION_TEMPLATES:
+                    question = template.format(step=step, attestors=a_str)
+                    for command in COMMAND_PATTERNS:
+                        if count >= target:
+                            return
+                        count += 1
+                        yield count, attestors, step, question, command
+
+
+def print_stats():
+    num_combos = len(get_attestor_combinations())
+    sys.stdout.write("\n".join([
+        "Enhanced Diversity Statistics:",
+        f"  Attestor combinations: {num_combos}",
+        f"  Step names: {len(STEP_NAMES)}",
+        f"  Question templates: {len(USER_QUESTION_TEMPLATES)}",
+        f"  Command patterns: {len(COMMAND_PATTERNS)}",
+        f"  Total variations: {num_combos * len(STEP_NAMES) * len(USER_QUESTION_TEMPLATES) * len(COMMAND_PATTERNS):,}",
+        "",
+        "",
+    ]))
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Generate enhanced, diverse verified witness examples"
+    )
+    parser.add_argument(
+        "--target",
+        type=int,
+        default=0,
+        help="Number of examples to attempt (default: 0, only print diversity statistics)"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=str(DEFAULT_OUTPUT),
+        help="Output JSONL file"
+    )
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes (default: CPU count)"
+    )
+    args = parser.parse_args()
+
+    print_stats()
+    if args.target <= 0:
+        return
+
+    output_file = Path(args.output)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+
+    success = 0
+    # Workers run the witness subprocesses; the writer stays in this process so
+    # the JSONL is written sequentially in job order.
+    with ProcessPoolExecutor(max_workers=args.parallel, initializer=_init_worker, initargs=(output_file,)) as ex, \
+            open(output_file, 'wb', buffering=1024 * 1024) as f:
+        for i, result in enumerate(ex.map(gen_one, iter_jobs(args.target), chunksize=64), 1):
+            if result is not None:
+                f.write(json.dumps(result).encode() + b'\n')
+                success += 1
+            if i % 100 == 0:
+                print(f"Progress: {i:,}/{args.target:,} (Success: {success:,})")
+
+    print(f"Verified: {success:,}/{args.target:,}")
+    print(f"Output: {output_file}")
+
+
+if __name__ == "__main__":
+    main()
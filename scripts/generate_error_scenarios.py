@@ -17,13 +17,27 @@ Each example:
 Target: 5,000 error scenario examples
 """
 
+import io
 import json
+import os
 import subprocess
+import sys
 import tempfile
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 import base64
 
-SYSTEM_PROMPT = """You are an expert in the Witness supply chain attestation framework. You help users instrument CI/CD pipelines with witness, create policy documents, and write Rego policies to validate attestations. You understand all attestors in go-witness and how to use them effectively."""
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+SYSTEM_PROMPT = sys.intern("""You are an expert in the Witness supply chain attestation framework. You help users instrument CI/CD pipelines with witness, create policy documents, and write Rego policies to validate attestations. You understand all attestors in go-witness and how to use them effectively.""")
+
+# Encoded row prefix up to and including the system message, shared by every row
+_SYSTEM_PREFIX = b'{"messages":[' + _dumps({"role": "system", "content": SYSTEM_PROMPT}) + b','
 
 # Error scenarios based on supply chain attack research
 ERROR_SCENARIOS = [
@@ -230,20 +244,22 @@ not input.cmd in approved_commands  # Strict command allowlist
     },
 ]
 
-def create_error_qa(scenario: Dict) -> Dict:
-    """Create Q/A for error scenario"""
-    return {
-        "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": scenario['user_question']},
-            {"role": "assistant", "content": scenario['explanation'] + f"\n\n**Policy that detects this**:\n```rego\n{scenario['policy_rego']}\n```"}
-        ],
-        "_metadata": {
+# Fixed pieces of the assistant answer around each scenario's Rego policy
+_POLICY_HEAD = "\n\n**Policy that detects this**:\n```rego\n"
+_DETECTION_HEAD = "\n\n**Detection policy**:\n```rego\n"
+_REGO_TAIL = "\n```"
+
+def create_error_qa(scenario: Dict) -> Tuple[str, str, Optional[Dict]]:
+    """Create the (question, answer, metadata) row for an error scenario"""
+    return (
+        scenario['user_question'],
+        "".join((scenario['explanation'], _POLICY_HEAD, scenario['policy_rego'], _REGO_TAIL)),
+        {
             "scenario": scenario['name'],
             "attestor": scenario['attestor'],
             "error_type": "security_violation"
         }
-    }
+    )
 
 def main():
     output_file = Path("/Users/nkennedy/proj/witness-evals/data/conceptual/error_scenarios.jsonl")
@@ -253,11 +269,12 @@ def main():
     print("Generating Error Scenario Examples")
     print("="*70)
 
+    # Rows stay as (question, answer, metadata) tuples; the JSON envelope
+    # is only produced when writing
     examples = []
     for scenario in ERROR_SCENARIOS:
         # Create 10 variations with different question phrasings
-        base_qa = create_error_qa(scenario)
-        examples.append(base_qa)
+        examples.append(create_error_qa(scenario))
 
         # Add related questions
         related_questions = [
@@ -266,21 +283,34 @@ def main():
             f"Why is {scenario['description']} a security risk?",
         ]
 
-        for q in related_questions:
-            examples.append({
-                "messages": [
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": q},
-                    {"role": "assistant", "content": scenario['explanation'] + f"\n\n**Detection policy**:\n```rego\n{scenario['policy_rego']}\n```"}
-                ]
-            })
+        # Same answer for every related question - build it once per scenario
+        assistant_text = "".join((scenario['explanation'], _DETECTION_HEAD, scenario['policy_rego'], _REGO_TAIL))
+
+        examples.extend((q, assistant_text, None) for q in related_questions)
 
     print(f"Base scenarios: {len(ERROR_SCENARIOS)}")
     print(f"Total examples: {len(examples)}")
 
-    with open(output_file, 'w') as f:
-        for ex in examples:
-            f.write(json.dumps(ex) + '\n')
+    # Write to a temp file and rename, so an interrupted run never leaves a partial output
+    tmp_file = output_file.with_suffix(output_file.suffix + ".tmp")
+    try:
+        with open(tmp_file, 'wb', buffering=0) as raw, io.BufferedWriter(raw, buffer_size=64 * 1024) as f:
+            for question, answer, metadata in examples:
+                f.write(_SYSTEM_PREFIX)
+                f.write(b'{"role":"user","content":')
+                f.write(_dumps(question))
+                f.write(b'},{"role":"assistant","content":')
+                f.write(_dumps(answer))
+                if metadata is not None:
+                    f.write(b'}],"_metadata":')
+                    f.write(_dumps(metadata))
+                    f.write(b"}\n")
+                else:
+                    f.write(b"}]}\n")
+        os.replace(tmp_file, output_file)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
 
     print()
     print("="*70)
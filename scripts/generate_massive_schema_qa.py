@@ -14,15 +14,38 @@ Target: 10,000 schema Q/A covering every field of every attestor.
 """
 
 import json
-import subprocess
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List
 import random
 
+from _witness_cli import extract_fields, get_attestor_schemas, list_attestors, render_field_list
+
 random.seed(42)
 
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
 SYSTEM_PROMPT = """You are an expert in the Witness supply chain attestation framework. You help users instrument CI/CD pipelines with witness, create policy documents, and write Rego policies to validate attestations. You understand all attestors in go-witness and how to use them effectively."""
 
+# Shared by every example; only ever serialized, never mutated
+_SYS_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+
+# Encoded row prefix up to and including the system message, shared by every row
+_SYSTEM_PREFIX = b'{"messages":[' + _dumps(_SYS_MSG) + b','
+
+
+def encode_row(ex) -> bytes:
+    """JSONL line for an example, splicing in the cached system-message encoding"""
+    _, user_msg, assistant_msg = ex["messages"]
+    return _SYSTEM_PREFIX + _dumps(user_msg) + b',' + _dumps(assistant_msg) + b']}\n'
+
 # Massive question template variations
 FIELD_QUESTIONS = [
     "What is the {field} field in {attestor}?",
@@ -56,68 +79,22 @@ ATTESTOR_OVERVIEW_QUESTIONS = [
     "What's the JSON structure of {attestor}?",
 ]
 
-def get_attestor_list():
-    result = subprocess.run(["witness", "attestors", "list"], capture_output=True, text=True)
-    attestors = []
-    for line in result.stdout.split('\n'):
-        if '|' in line and 'NAME' not in line and '---' not in line:
-            parts = [p.strip() for p in line.split('|')]
-            if len(parts) > 1 and parts[1]:
-                name = parts[1].replace(' (default)', '').replace(' (always run)', '').strip()
-                if name and name != 'NAME':
-                    attestors.append(name)
-    return attestors
-
-def get_attestor_schema(attestor):
-    result = subprocess.run(["witness", "attestors", "schema", attestor], capture_output=True, text=True)
-    if result.returncode != 0:
-        return None
-    try:
-        return json.loads(result.stdout)
-    except:
-        return None
-
-def extract_fields(schema):
-    if not schema or '$defs' not in schema:
-        return {}
-    defs = schema['$defs']
-    main_def = None
-    for def_name, def_content in defs.items():
-        if 'Attestor' in def_name or len(defs) == 1:
-            main_def = def_content
-            break
-    if not main_def or 'properties' not in main_def:
-        return {}
-
-    fields = {}
-    properties = main_def['properties']
-    required = main_def.get('required', [])
-
-    for field_name, field_def in properties.items():
-        if not isinstance(field_def, dict):
-            continue
-        field_type = field_def.get('type', 'unknown')
-        if '$ref' in field_def:
-            field_type = field_def['$ref'].split('/')[-1]
-        if field_type == 'array' and 'items' in field_def and isinstance(field_def['items'], dict):
-            item_type = field_def['items'].get('type', 'object')
-            field_type = f'array of {item_type}'
-
-        fields[field_name] = {'type': field_type, 'required': field_name in required}
-
-    return fields
+# Permutation tables of template indices, drawn once (seeded above) instead of
+# calling random.sample for every field. Fields pick an entry by variant
+# number, so the output does not depend on which worker process builds it;
+# an attestor with up to MAX_FIELDS_EXPECTED fields never repeats an entry.
+MAX_FIELDS_EXPECTED = 64
+FIELD_PERMS = [random.sample(range(len(FIELD_QUESTIONS)), 5) for _ in range(MAX_FIELDS_EXPECTED)]
+REGO_PERMS = [random.sample(range(len(REGO_QUESTIONS)), min(3, len(REGO_QUESTIONS))) for _ in range(MAX_FIELDS_EXPECTED)]
 
-def create_field_qa(attestor, field, field_info):
+def create_field_qa(attestor, field, field_info, variant=0):
     """Create 10+ Q/A for a single field"""
     examples = []
+    example_value = get_example_value(field_info['type'])
 
-    # Basic field Q/A (5 variations)
-    for template in random.sample(FIELD_QUESTIONS, 5):
-        examples.append({
-            "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": template.format(field=field, attestor=attestor)},
-                {"role": "assistant", "content": f"""The `{field}` field in {attestor} attestations:
+    # Template placeholders and answer text are the same for every variation
+    names = {"field": field, "attestor": attestor}
+    field_answer = f"""The `{field}` field in {attestor} attestations:
 
 **Type**: `{field_info['type']}`
 **Required**: {"Yes" if field_info['required'] else "No"}
@@ -127,32 +104,42 @@ This field is automatically populated when you use the {attestor} attestor in yo
 **Example**:
 ```json
 {{
-  "{field}": {get_example_value(field_info['type'])}
+  "{field}": {example_value}
 }}
-```"""}
+```"""
+
+    # Basic field Q/A (5 variations)
+    for i in FIELD_PERMS[variant % MAX_FIELDS_EXPECTED]:
+        examples.append({
+            "messages": [
+                _SYS_MSG,
+                {"role": "user", "content": FIELD_QUESTIONS[i].format_map(names)},
+                {"role": "assistant", "content": field_answer}
             ]
         })
 
     # Rego validation Q/A (3 variations)
-    for template in random.sample(REGO_QUESTIONS, min(3, len(REGO_QUESTIONS))):
-        rego_example = generate_rego_for_field(attestor, field, field_info)
-        examples.append({
-            "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": template.format(field=field, attestor=attestor)},
-                {"role": "assistant", "content": f"""Here's a Rego policy to validate `{field}` in {attestor} attestations:
+    rego_example = generate_rego_for_field(attestor, field, field_info['type'], field_info['required'])
+    rego_answer = f"""Here's a Rego policy to validate `{field}` in {attestor} attestations:
 
 ```rego
 {rego_example}
 ```
 
-Add this to your policy document under the {attestor} attestation's `regopolicies` field."""}
+Add this to your policy document under the {attestor} attestation's `regopolicies` field."""
+    for i in REGO_PERMS[variant % MAX_FIELDS_EXPECTED]:
+        examples.append({
+            "messages": [
+                _SYS_MSG,
+                {"role": "user", "content": REGO_QUESTIONS[i].format_map(names)},
+                {"role": "assistant", "content": rego_answer}
             ]
         })
 
     return examples
 
-def generate_rego_for_field(attestor, field, field_info):
+@lru_cache(maxsize=4096)
+def generate_rego_for_field(attestor, field, field_type, required):
     """Generate Rego policy example for a field"""
     if field == 'branch' or field == 'refnameshort':
         return f'''package {attestor}
@@ -202,40 +189,43 @@ deny contains msg if {{
     msg := "{field} must not be empty"
 }}'''
 
+# Checked in order: the first key contained in the field type wins
+_EXAMPLE_VALUES = {
+    'string': '"example-value"',
+    'int': '0',
+    'bool': 'true',
+    'array': '["item1", "item2"]',
+}
+
+@lru_cache(maxsize=64)
 def get_example_value(field_type):
-    if 'string' in field_type.lower():
-        return '"example-value"'
-    elif 'int' in field_type.lower():
-        return '0'
-    elif 'bool' in field_type.lower():
-        return 'true'
-    elif 'array' in field_type.lower():
-        return '["item1", "item2"]'
-    else:
-        return '{}'
+    t = field_type.lower()
+    for key, value in _EXAMPLE_VALUES.items():
+        if key in t:
+            return value
+    return '{}'
 
 def create_attestor_qa(attestor, fields):
     """Create 20-30 Q/A per attestor"""
     examples = []
 
-    # Overview Q/A (8 variations)
-    for template in ATTESTOR_OVERVIEW_QUESTIONS:
-        field_list = "\n".join([
-            f"- **{fname}** ({finfo['type']}){'  *required*' if finfo['required'] else ''}"
-            for fname, finfo in fields.items()
-        ])
+    # Overview Q/A (8 variations) - the body is the same for every template
+    field_list = render_field_list(fields, name_mark="**", required_mark="  *required*")
+    req_count = sum(1 for f in fields.values() if f['required'])
+    opt_count = len(fields) - req_count
 
+    for template in ATTESTOR_OVERVIEW_QUESTIONS:
         examples.append({
             "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
+                _SYS_MSG,
                 {"role": "user", "content": template.format(attestor=attestor)},
                 {"role": "assistant", "content": f"""The {attestor} attestor schema includes:
 
 {field_list}
 
 **Total fields**: {len(fields)}
-**Required**: {sum(1 for f in fields.values() if f['required'])}
-**Optional**: {sum(1 for f in fields.values() if not f['required'])}
+**Required**: {req_count}
+**Optional**: {opt_count}
 
 View full schema:
 ```bash
@@ -244,13 +234,20 @@ witness attestors schema {attestor}
             ]
         })
 
-    # Per-field Q/A (10+ per field)
-    for field_name, field_info in fields.items():
-        field_examples = create_field_qa(attestor, field_name, field_info)
+    # Per-field Q/A (10+ per field), variants offset by a stable attestor hash
+    base = zlib.crc32(attestor.encode())
+    for n, (field_name, field_info) in enumerate(fields.items()):
+        field_examples = create_field_qa(attestor, field_name, field_info, base + n)
         examples.extend(field_examples)
 
     return examples
 
+def attestor_lines(job):
+    """Worker: serialized JSONL for one (attestor, fields) pair, plus its Q/A count"""
+    attestor, fields = job
+    qa = create_attestor_qa(attestor, fields)
+    return b"".join(map(encode_row, qa)), len(qa)
+
 def main():
     output_file = Path("/Users/nkennedy/proj/witness-evals/data/conceptual/massive_schemas.jsonl")
     output_file.parent.mkdir(parents=True, exist_ok=True)
@@ -259,14 +256,16 @@ def main():
     print("Generating MASSIVE Schema Q/A (Target: 5,000-10,000 examples)")
     print("="*70)
 
-    attestors = get_attestor_list()
+    attestors = list_attestors()
     print(f"Attestors found: {len(attestors)}\n")
 
-    all_examples = []
+    total_examples = 0
     total_fields = 0
 
-    for attestor in attestors:
-        schema = get_attestor_schema(attestor)
+    schemas = get_attestor_schemas(attestors)
+
+    jobs = []
+    for attestor, schema in schemas.items():
         if not schema:
             print(f"  ⚠️  {attestor}: No schema")
             continue
@@ -276,20 +275,22 @@ def main():
             print(f"  ⚠️  {attestor}: No fields")
             continue
 
-        qa = create_attestor_qa(attestor, fields)
-        all_examples.extend(qa)
-        total_fields += len(fields)
+        jobs.append((attestor, fields))
 
-        print(f"  ✓ {attestor}: {len(fields)} fields → {len(qa)} Q/A")
+    # Q/A generation is pure-Python CPU work and independent per attestor, so
+    # spread it over all cores; map() keeps attestor order in the output
+    with open(output_file, 'wb', buffering=1024 * 1024) as out, ProcessPoolExecutor() as pool:
+        for (attestor, fields), (blob, count) in zip(jobs, pool.map(attestor_lines, jobs)):
+            out.write(blob)
+            total_examples += count
+            total_fields += len(fields)
 
-    with open(output_file, 'w') as f:
-        for ex in all_examples:
-            f.write(json.dumps(ex) + '\n')
+            print(f"  ✓ {attestor}: {len(fields)} fields → {count} Q/A")
 
     print("="*70)
-    print(f"🎉 Generated {len(all_examples):,} schema Q/A pairs!")
+    print(f"🎉 Generated {total_examples:,} schema Q/A pairs!")
     print(f"   Fields covered: {total_fields}")
-    print(f"   Avg Q/A per attestor: {len(all_examples) / len(attestors):.1f}")
+    print(f"   Avg Q/A per attestor: {total_examples / len(attestors):.1f}")
     print(f"   Output: {output_file}")
     print(f"   Size: {output_file.stat().st_size / 1024 / 1024:.1f} MB")
     print()
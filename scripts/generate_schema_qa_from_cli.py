@@ -13,108 +13,43 @@ Target: 5,000-10,000 schema Q/A pairs from official source of truth.
 """
 
 import json
-import subprocess
+from itertools import islice
 from pathlib import Path
 from typing import Dict, List
 
+from _witness_cli import extract_fields, get_attestor_schemas, list_attestors, render_field_list
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
 SYSTEM_PROMPT = """You are an expert in the Witness supply chain attestation framework. You help users instrument CI/CD pipelines with witness, create policy documents, and write Rego policies to validate attestations. You understand all attestors in go-witness and how to use them effectively."""
 
-# Get attestor list from witness CLI
-def get_attestor_list() -> List[str]:
-    """Get list of all attestors from witness"""
-    result = subprocess.run(
-        ["witness", "attestors", "list"],
-        capture_output=True,
-        text=True
-    )
-
-    attestors = []
-    for line in result.stdout.split('\n'):
-        if '|' in line and 'NAME' not in line and '---' not in line:
-            parts = [p.strip() for p in line.split('|')]
-            if len(parts) > 1 and parts[1]:
-                name = parts[1].replace(' (default)', '').replace(' (always run)', '').strip()
-                if name and name != 'NAME':
-                    attestors.append(name)
-
-    return attestors
-
-def get_attestor_schema(attestor: str) -> Dict:
-    """Get JSON schema for an attestor"""
-    result = subprocess.run(
-        ["witness", "attestors", "schema", attestor],
-        capture_output=True,
-        text=True
-    )
-
-    if result.returncode != 0:
-        return None
-
-    try:
-        return json.loads(result.stdout)
-    except:
-        return None
-
-def extract_fields_from_schema(schema: Dict) -> Dict[str, Dict]:
-    """Extract field names, types, and required status from JSON schema"""
-    if not schema or '$defs' not in schema:
-        return {}
-
-    # Get main definition (usually first one or named after attestor)
-    defs = schema['$defs']
-    main_def = None
-
-    # Try to find Attestor definition
-    for def_name, def_content in defs.items():
-        if 'Attestor' in def_name or len(defs) == 1:
-            main_def = def_content
-            break
-
-    if not main_def or 'properties' not in main_def:
-        return {}
-
-    fields = {}
-    properties = main_def['properties']
-    required = main_def.get('required', [])
-
-    for field_name, field_def in properties.items():
-        # Handle boolean field_def (additionalProperties: true/false)
-        if not isinstance(field_def, dict):
-            continue
-
-        field_type = field_def.get('type', 'unknown')
-
-        # Handle references
-        if '$ref' in field_def:
-            ref = field_def['$ref'].split('/')[-1]
-            field_type = ref
-
-        # Handle arrays
-        if field_type == 'array' and 'items' in field_def:
-            if isinstance(field_def['items'], dict):
-                item_type = field_def['items'].get('type', 'object')
-                field_type = f'array of {item_type}'
-
-        fields[field_name] = {
-            'type': field_type,
-            'required': field_name in required
-        }
-
-    return fields
+# Shared by every example; only ever serialized, never mutated
+_SYS_MSG = {"role": "system", "content": SYSTEM_PROMPT}
+
+# Encoded row prefix up to and including the system message, shared by every row
+_SYSTEM_PREFIX = b'{"messages":[' + _dumps(_SYS_MSG) + b','
+
+
+def encode_row(ex) -> bytes:
+    """JSONL line for an example, splicing in the cached system-message encoding"""
+    _, user_msg, assistant_msg = ex["messages"]
+    return _SYSTEM_PREFIX + _dumps(user_msg) + b',' + _dumps(assistant_msg) + b']}\n'
 
 def create_attestor_qa(attestor: str, fields: Dict[str, Dict]) -> List[Dict]:
     """Create comprehensive Q/A for an attestor"""
     examples = []
 
     # Q1: Overview - What fields does attestor capture?
-    field_list = "\n".join([
-        f"- `{fname}` ({finfo['type']}){'  **required**' if finfo['required'] else ''}"
-        for fname, finfo in fields.items()
-    ])
+    field_list = render_field_list(fields)
 
     examples.append({
         "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
+            _SYS_MSG,
             {"role": "user", "content": f"What fields does the {attestor} attestor capture?"},
             {"role": "assistant", "content": f"""The {attestor} attestor captures these fields:
 
@@ -135,7 +70,7 @@ All fields are automatically captured when you include `{attestor}` in `--attest
     # Q2: Schema structure
     examples.append({
         "messages": [
-            {"role": "system", "content": SYSTEM_PROMPT},
+            _SYS_MSG,
             {"role": "user", "content": f"Show me the JSON schema for {attestor} attestations."},
             {"role": "assistant", "content": f"""The {attestor} attestor has {len(fields)} fields:
 
@@ -153,7 +88,7 @@ witness attestors schema {attestor}
 **Example attestation**:
 ```json
 {{
-  {chr(10).join([f'  "{fname}": {get_example_value(finfo["type"])},' for fname, finfo in list(fields.items())[:5]])}
+  {chr(10).join([f'  "{fname}": {get_example_value(finfo["type"])},' for fname, finfo in islice(fields.items(), 5)])}
   ...
 }}
 ```"""}
@@ -161,10 +96,10 @@ witness attestors schema {attestor}
     })
 
     # Q3-N: Individual field questions
-    for field_name, field_info in list(fields.items())[:20]:  # Limit to top 20 fields
+    for field_name, field_info in islice(fields.items(), 20):  # Limit to top 20 fields
         examples.append({
             "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
+                _SYS_MSG,
                 {"role": "user", "content": f"What is the {field_name} field in {attestor} attestations?"},
                 {"role": "assistant", "content": f"""The `{field_name}` field in {attestor} attestations:
 
@@ -190,39 +125,45 @@ deny contains msg if {{
 
     return examples
 
+# Example JSON value per type keyword, checked in order
+EXAMPLE_VALUES = {
+    'string': '"example"',
+    'integer': '0',
+    'boolean': 'true',
+    'array': '[]',
+    'object': '{}',
+}
+
 def get_example_value(field_type: str) -> str:
     """Get example JSON value for a type"""
-    examples = {
-        'string': '"example"',
-        'integer': '0',
-        'boolean': 'true',
-        'array': '[]',
-        'object': '{}',
-    }
-
-    for type_key, ex_val in examples.items():
-        if type_key in field_type.lower():
+    field_type = field_type.lower()
+    for type_key, ex_val in EXAMPLE_VALUES.items():
+        if type_key in field_type:
             return ex_val
 
     return '"..."'
 
+# Descriptions of well-known attestor fields
+FIELD_DESCRIPTIONS = {
+    'commithash': '**Purpose**: The SHA hash of the current git commit\n**Example**: "a1b2c3d4e5f6..."',
+    'branch': '**Purpose**: The current git branch name\n**Example**: "main", "develop", "feature/auth"',
+    'author': '**Purpose**: The git commit author name\n**Example**: "John Doe"',
+    'authoremail': '**Purpose**: The git commit author email\n**Example**: "john@example.com"',
+    'hostname': '**Purpose**: The system hostname where attestation was created\n**Example**: "build-server-01.company.com"',
+    'os': '**Purpose**: The operating system\n**Example**: "linux", "darwin", "windows"',
+    'username': '**Purpose**: The current user\n**Example**: "ci-runner", "buildbot"',
+    'cmd': '**Purpose**: The command executed as array\n**Example**: ["go", "build", "-o", "app"]',
+    'exitcode': '**Purpose**: Exit code from command\n**Example**: 0 (success), 1 (failure)',
+    'stdout': '**Purpose**: Standard output from command\n**Example**: "Build successful"',
+    'stderr': '**Purpose**: Standard error from command\n**Example**: Error messages if any',
+}
+
 def get_field_description(attestor: str, field: str) -> str:
     """Get description of what a field contains"""
-    descriptions = {
-        'commithash': '**Purpose**: The SHA hash of the current git commit\n**Example**: "a1b2c3d4e5f6..."',
-        'branch': '**Purpose**: The current git branch name\n**Example**: "main", "develop", "feature/auth"',
-        'author': '**Purpose**: The git commit author name\n**Example**: "John Doe"',
-        'authoremail': '**Purpose**: The git commit author email\n**Example**: "john@example.com"',
-        'hostname': '**Purpose**: The system hostname where attestation was created\n**Example**: "build-server-01.company.com"',
-        'os': '**Purpose**: The operating system\n**Example**: "linux", "darwin", "windows"',
-        'username': '**Purpose**: The current user\n**Example**: "ci-runner", "buildbot"',
-        'cmd': '**Purpose**: The command executed as array\n**Example**: ["go", "build", "-o", "app"]',
-        'exitcode': '**Purpose**: Exit code from command\n**Example**: 0 (success), 1 (failure)',
-        'stdout': '**Purpose**: Standard output from command\n**Example**: "Build successful"',
-        'stderr': '**Purpose**: Standard error from command\n**Example**: Error messages if any',
-    }
-
-    return descriptions.get(field, f'**Purpose**: Part of {attestor} attestation data')
+    desc = FIELD_DESCRIPTIONS.get(field)
+    if desc is not None:
+        return desc
+    return f'**Purpose**: Part of {attestor} attestation data'
 
 def main():
     output_file = Path("/Users/nkennedy/proj/witness-evals/data/conceptual/schemas_from_cli.jsonl")
@@ -232,41 +173,39 @@ def main():
     print("="*60)
 
     # Get all attestors
-    attestors = get_attestor_list()
+    attestors = list_attestors()
     print(f"Found {len(attestors)} attestors\n")
 
-    all_examples = []
+    total_examples = 0
     total_fields = 0
 
-    for attestor in attestors:
-        # Get schema
-        schema = get_attestor_schema(attestor)
-
-        if not schema:
-            print(f"  ⚠️  {attestor}: No schema available")
-            continue
+    # Get schemas
+    schemas = get_attestor_schemas(attestors)
 
-        # Extract fields
-        fields = extract_fields_from_schema(schema)
+    # Write each Q/A as soon as it is produced instead of holding them all
+    with open(output_file, 'wb', buffering=1024 * 1024) as out:
+        for attestor, schema in schemas.items():
+            if not schema:
+                print(f"  ⚠️  {attestor}: No schema available")
+                continue
 
-        if not fields:
-            print(f"  ⚠️  {attestor}: No fields extracted")
-            continue
+            # Extract fields
+            fields = extract_fields(schema)
 
-        # Generate Q/A
-        qa_examples = create_attestor_qa(attestor, fields)
-        all_examples.extend(qa_examples)
-        total_fields += len(fields)
+            if not fields:
+                print(f"  ⚠️  {attestor}: No fields extracted")
+                continue
 
-        print(f"  ✓ {attestor}: {len(fields)} fields, {len(qa_examples)} Q/A")
+            # Generate Q/A
+            qa_examples = create_attestor_qa(attestor, fields)
+            out.writelines(map(encode_row, qa_examples))
+            total_examples += len(qa_examples)
+            total_fields += len(fields)
 
-    # Save
-    with open(output_file, 'w') as f:
-        for ex in all_examples:
-            f.write(json.dumps(ex) + '\n')
+            print(f"  ✓ {attestor}: {len(fields)} fields, {len(qa_examples)} Q/A")
 
     print("="*60)
-    print(f"✅ Generated {len(all_examples):,} schema Q/A pairs")
+    print(f"✅ Generated {total_examples:,} schema Q/A pairs")
     print(f"   Total fields documented: {total_fields}")
     print(f"   Output: {output_file}")
     print(f"   Size: {output_file.stat().st_size / 1024:.1f} KB")
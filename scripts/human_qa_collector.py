@@ -11,9 +11,18 @@ Guides humans to contribute Q/A in knowledge gap areas:
 - Package managers
 """
 
-import json
 from pathlib import Path
-import sys
+
+
+def _dumps(obj) -> bytes:
+    # Serializer is imported on first save so browsing the menu stays cheap
+    try:
+        import orjson
+    except ImportError:
+        import json
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return orjson.dumps(obj)
+
 
 SYSTEM_PROMPT = """You are an expert in the Witness supply chain attestation framework. You help users instrument CI/CD pipelines with witness, create policy documents, and write Rego policies to validate attestations. You understand all attestors in go-witness and how to use them effectively."""
 
@@ -172,8 +181,8 @@ def main():
             print(f"\n✓ Added! Total collected: {len(collected)}")
 
             # Save incrementally
-            with open(output_file, 'a') as f:
-                f.write(json.dumps(qa) + '\n')
+            with open(output_file, 'ab') as f:
+                f.write(_dumps(qa) + b'\n')
 
     print(f"\n{'='*70}")
     print(f"Session complete!")
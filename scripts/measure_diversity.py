@@ -10,86 +10,252 @@ For each Q/A pair:
 5. Report diversity metrics
 """
 
+import heapq
 import json
+import random
 import numpy as np
 from pathlib import Path
+import torch
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import sys
 
-print("Loading embedding model...")
-model = SentenceTransformer('all-MiniLM-L6-v2')  # Small, fast
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    # Exact k-NN search for near-duplicates instead of scanning every pair
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    # SIMD-specialized cosine kernels; NumPy matmul is the fallback
+    import simsimd
+except ImportError:
+    simsimd = None
+
+if torch.cuda.is_available():
+    device = 'cuda'
+elif torch.backends.mps.is_available():
+    device = 'mps'
+else:
+    device = 'cpu'
+
+try:
+    # int8 CTranslate2 build of the same MiniLM: same embeddings to within
+    # noise that doesn't matter for diversity stats, a fraction of the cost
+    from hf_hub_ctranslate2 import CT2SentenceTransformer
+except ImportError:
+    CT2SentenceTransformer = None
+
+if CT2SentenceTransformer is not None and device != 'mps':
+    print(f"Loading int8 embedding model on {device}...")
+    model = CT2SentenceTransformer(
+        'sentence-transformers/all-MiniLM-L6-v2',
+        compute_type='int8_float16' if device == 'cuda' else 'int8',
+        device=device,
+    )
+else:
+    print(f"Loading embedding model on {device}...")
+    model = SentenceTransformer('all-MiniLM-L6-v2', device=device)  # Small, fast
+    if device != 'cpu':
+        # fp16 forward pass; the similarity stats don't need fp32 precision
+        model.half()
 
-# Load backup data
+# Load backup data, reservoir-sampling as we go (embedding 36K takes time,
+# and this way the full file is never held in memory)
 data_file = Path("data/diverse-100k/train_backup.jsonl")
 print(f"Loading {data_file}...")
 
-with open(data_file, 'r') as f:
-    examples = [json.loads(line) for line in f]
+def sample_fields(line):
+    """User question and embedding text (user Q + assistant A) of a JSONL line
 
-print(f"Loaded {len(examples)} examples")
+    Only these two strings are kept per sampled example, not the parsed dict.
+    """
+    messages = _loads(line)['messages']
+    user_q = messages[1]['content']
+    assistant_a = messages[2]['content'][:500]  # First 500 chars
+    return user_q, user_q + " " + assistant_a
 
-# Sample for speed (embedding 36K takes time)
-sample_size = min(5000, len(examples))
-print(f"Analyzing {sample_size} examples...")
 
-import random
-random.seed(42)
-sampled = random.sample(examples, sample_size)
+SAMPLE_SIZE = 5000
+rng = random.Random(42)
+sampled = []
+total = 0
+with open(data_file, 'rb') as f:
+    for total, line in enumerate(f, 1):
+        if total <= SAMPLE_SIZE:
+            sampled.append(sample_fields(line))
+        else:
+            j = rng.randint(0, total - 1)
+            if j < SAMPLE_SIZE:
+                sampled[j] = sample_fields(line)
+
+print(f"Loaded {total} examples")
+print(f"Analyzing {len(sampled)} examples...")
 
-# Create text for embedding (user Q + assistant A)
-texts = []
-for ex in sampled:
-    user_q = ex['messages'][1]['content']
-    assistant_a = ex['messages'][2]['content'][:500]  # First 500 chars
-    combined = user_q + " " + assistant_a
-    texts.append(combined)
+questions = [q for q, _ in sampled]
+texts = [text for _, text in sampled]
 
+# Encode shortest-first so each batch pads to a similar length, then restore
+# the sample order. Embeddings come back unit-length, so a plain dot product
+# is the cosine similarity.
 print("Generating embeddings...")
-embeddings = model.encode(texts, show_progress_bar=True)
+order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+emb_sorted = model.encode(
+    [texts[i] for i in order],
+    batch_size=128,
+    normalize_embeddings=True,
+    convert_to_numpy=True,
+    show_progress_bar=True,
+)
+embeddings = emb_sorted[np.argsort(order)]
 
 print(f"Embedding shape: {embeddings.shape}")
 
-# Calculate pairwise cosine similarities
+emb = embeddings.astype(np.float32)
+
+
+def block_similarities(rows, cols):
+    """Cosine similarity of every row against every col"""
+    if simsimd is not None:
+        return 1.0 - np.asarray(simsimd.cdist(rows, cols, metric='cosine'))
+    return rows @ cols.T
+
+
+# Walk the strict upper triangle of emb @ emb.T one block of rows at a time,
+# so only a BLOCK x N slice is ever in memory, and keep running statistics.
+# With FAISS the near-duplicates come from a k-NN search over every example
+# instead, and the distribution stats only need a random subset of pairs.
 print("Calculating pairwise similarities...")
-similarities = cosine_similarity(embeddings)
+BLOCK = 512
+KNN = 50
+STATS_SAMPLE = 2000
+thresholds = [0.95, 0.90, 0.85, 0.80]
+
+if faiss is not None and len(emb) > STATS_SAMPLE:
+    # Reservoir slots are not exchangeable, so draw the subset afresh
+    stats_emb = emb[sorted(rng.sample(range(len(emb)), STATS_SAMPLE))]
+else:
+    stats_emb = emb
+n = len(stats_emb)
+n_pairs = n * (n - 1) // 2
+sim_sum = 0.0
+sim_sum_sq = 0.0
+sim_min = np.inf
+sim_max = -np.inf
+above = dict.fromkeys(thresholds, 0)
+# Median comes from a 0.001-wide histogram rather than a full sort
+hist_edges = np.linspace(-1.0, 1.0, 2001)
+hist = np.zeros(len(hist_edges) - 1, dtype=np.int64)
+top_pairs = []  # min-heap of (sim, i, j) for the 5 most similar pairs
+
+for start in range(0, n, BLOCK):
+    stop = min(start + BLOCK, n)
+    # Columns before `start` belong to pairs already seen in earlier blocks
+    block = block_similarities(stats_emb[start:stop], stats_emb[start:n])
+    mask = np.arange(start, n)[None, :] > np.arange(start, stop)[:, None]
+    sims = block[mask]
+    if sims.size == 0:
+        continue
+
+    # Reductions straight off the block values, accumulated in float64,
+    # with no squared or upcast temporaries
+    sim_sum += float(np.add.reduce(sims, dtype=np.float64))
+    sim_sum_sq += float(np.einsum('i,i->', sims, sims, dtype=np.float64))
+    sim_min = min(sim_min, float(np.minimum.reduce(sims)))
+    sim_max = max(sim_max, float(np.maximum.reduce(sims)))
+    hist += np.histogram(sims, bins=hist_edges)[0]
+    if faiss is not None:
+        continue
 
-# Get upper triangle (avoid diagonal and duplicates)
-triu_indices = np.triu_indices_from(similarities, k=1)
-pairwise_sims = similarities[triu_indices]
+    for thresh in thresholds:
+        above[thresh] += int(np.count_nonzero(sims > thresh))
+    flat = np.flatnonzero(mask)
+    # Top 5 of the block in linear time; the heap orders them across blocks
+    k_top = min(5, sims.size)
+    for idx in np.argpartition(sims, -k_top)[-k_top:]:
+        row, col = divmod(int(flat[idx]), block.shape[1])
+        item = (float(sims[idx]), start + row, start + col)
+        if len(top_pairs) < 5:
+            heapq.heappush(top_pairs, item)
+        else:
+            heapq.heappushpop(top_pairs, item)
+
+# Every pair above the lowest threshold shows up in the k-NN list of at
+# least one side unless both sides already have KNN closer neighbours
+saturated = 0
+if faiss is not None:
+    index = faiss.IndexFlatIP(emb.shape[1])
+    if device == 'cuda' and hasattr(faiss, 'StandardGpuResources'):
+        index = faiss.index_cpu_to_gpu(faiss.StandardGpuResources(), 0, index)
+    index.add(emb)
+    k = min(KNN, len(emb))
+    knn_sims, knn_ids = index.search(emb, k)
+
+    rows = np.repeat(np.arange(len(emb)), k)
+    cols = knn_ids.ravel()
+    keep = (cols >= 0) & (cols != rows)
+    lo = np.minimum(rows[keep], cols[keep]).astype(np.int64)
+    hi = np.maximum(rows[keep], cols[keep]).astype(np.int64)
+    pair_keys, first = np.unique(lo * len(emb) + hi, return_index=True)
+    pair_sims = knn_sims.ravel()[keep][first]
+
+    for thresh in thresholds:
+        above[thresh] = int(np.count_nonzero(pair_sims > thresh))
+    k_top = min(5, pair_sims.size)
+    for idx in np.argpartition(pair_sims, -k_top)[-k_top:] if k_top else []:
+        i, j = divmod(int(pair_keys[idx]), len(emb))
+        top_pairs.append((float(pair_sims[idx]), i, j))
+    saturated = int(np.count_nonzero(knn_sims[:, -1] > min(thresholds)))
+    # Every example's nearest neighbour is in the k-NN lists, so the true max is too
+    if pair_sims.size:
+        sim_max = max(sim_max, float(pair_sims.max()))
+    total_pairs = len(emb) * (len(emb) - 1) // 2
+else:
+    total_pairs = n_pairs
+
+sim_mean = sim_sum / n_pairs
+sim_std = np.sqrt(max(sim_sum_sq / n_pairs - sim_mean ** 2, 0.0))
+median_bin = int(np.searchsorted(np.cumsum(hist), (n_pairs + 1) / 2))
+sim_median = (hist_edges[median_bin] + hist_edges[median_bin + 1]) / 2
 
 # Statistics
 print("\n" + "="*70)
 print("Diversity Analysis")
 print("="*70)
-print(f"Mean similarity: {pairwise_sims.mean():.4f}")
-print(f"Median similarity: {np.median(pairwise_sims):.4f}")
-print(f"Min similarity: {pairwise_sims.min():.4f}")
-print(f"Max similarity: {pairwise_sims.max():.4f}")
-print(f"Std similarity: {pairwise_sims.std():.4f}")
+# Mean/median/min/std come from the random subset on the FAISS path; max and
+# the near-duplicate counts always cover every example
+sampled_note = f" (estimate from {n:,} random examples)" if n < len(emb) else ""
+print(f"Mean similarity: {sim_mean:.4f}{sampled_note}")
+print(f"Median similarity: {sim_median:.4f}{sampled_note}")
+print(f"Min similarity: {sim_min:.4f}{sampled_note}")
+print(f"Max similarity: {sim_max:.4f}")
+print(f"Std similarity: {sim_std:.4f}{sampled_note}")
 
-# Find near-duplicates
-thresholds = [0.95, 0.90, 0.85, 0.80]
+# Near-duplicates
 print(f"\nNear-duplicates (cosine similarity):")
 for thresh in thresholds:
-    count = (pairwise_sims > thresh).sum()
-    pct = count * 100 / len(pairwise_sims)
+    count = above[thresh]
+    pct = count * 100 / total_pairs
     print(f"  > {thresh}: {count:,} pairs ({pct:.2f}%)")
+if saturated:
+    print(f"  (lower bounds: {saturated:,} examples have {KNN}+ neighbours above {min(thresholds)})")
 
 # Diversity score (lower similarity = higher diversity)
-diversity_score = 1 - pairwise_sims.mean()
+diversity_score = 1 - sim_mean
 print(f"\nDiversity score: {diversity_score:.4f} (higher = more diverse)")
 print("  0.0 = all identical")
 print("  1.0 = maximally diverse")
 
-# Find most similar pairs (potential duplicates)
+# Most similar pairs (potential duplicates)
 print(f"\nMost similar pairs:")
-most_similar_idx = np.argsort(pairwise_sims)[-5:][::-1]
-for idx in most_similar_idx:
-    i, j = triu_indices[0][idx], triu_indices[1][idx]
-    sim = pairwise_sims[idx]
+for sim, i, j in sorted(top_pairs, reverse=True):
     print(f"  Similarity {sim:.4f}:")
-    print(f"    Q1: {sampled[i]['messages'][1]['content'][:60]}...")
-    print(f"    Q2: {sampled[j]['messages'][1]['content'][:60]}...")
+    print(f"    Q1: {questions[i][:60]}...")
+    print(f"    Q2: {questions[j][:60]}...")
 
 print("="*70)
@@ -13,115 +13,138 @@ Usage:
 """
 
 import json
+import multiprocessing
+import os
 import random
-import hashlib
-import uuid
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Any, Callable
 import argparse
 
-# Seed for reproducibility
-random.seed(42)
+# Examples per worker task; each chunk gets its own seed
+CHUNK_SIZE = 256
+
+# Policy expiry, formatted once per run rather than per example
+_EXPIRES = (datetime.now() + timedelta(days=365)).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+try:
+    import orjson
+    _dumps = orjson.dumps
+
+    def _pretty(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def _pretty(obj) -> str:
+        return json.dumps(obj, indent=2)
 
 # System prompt for all examples
 SYSTEM_PROMPT = """You are an expert in the Witness supply chain attestation framework. You help users instrument CI/CD pipelines with witness, create policy documents, and write Rego policies to validate attestations. You understand all attestors in go-witness and how to use them effectively."""
 
+# Shared by every example; only ever serialized, never mutated
+SYSTEM_MSG = {"role": "system", "content": SYSTEM_PROMPT}
 
-class FakeDataGenerator:
-    """Generate realistic fake data for attestations"""
 
-    @staticmethod
-    def sha1() -> str:
-        return hashlib.sha1(str(random.random()).encode()).hexdigest()
+# Pools for realistic fake attestation data
+_NAMES = ("alice", "bob", "charlie", "diana", "eve", "frank")
+_DOMAINS = ("example.com", "company.com", "org.com")
+_BRANCHES = (
+    "main", "master", "develop", "staging",
+    "feature/auth", "feature/api", "bugfix/security",
+    "release/v1.0", "hotfix/critical",
+)
+_COMMANDS = (
+    ["go", "build", "-o", "myapp"],
+    ["go", "test", "./..."],
+    ["npm", "run", "build"],
+    ["make", "all"],
+    ["docker", "build", "-t", "app:latest", "."],
+    ["python", "setup.py", "install"],
+    ["cargo", "build", "--release"],
+)
+_HOST_PREFIXES = ("build", "ci", "runner", "agent")
+_HOST_SUFFIXES = ("01", "02", "prod", "dev")
+_OS_NAMES = ("linux", "darwin", "windows")
+_COMMIT_MESSAGES = (
+    "feat: add new feature",
+    "fix: resolve bug",
+    "chore: update dependencies",
+    "refactor: improve code structure",
+)
+_USERNAMES = ("runner", "ci", "buildbot")
+_FILES = (
+    "main.go", "app.py", "index.js", "Makefile", "Dockerfile",
+    "package.json", "go.mod", "requirements.txt", "README.md",
+)
 
-    @staticmethod
-    def sha256() -> str:
-        return hashlib.sha256(str(random.random()).encode()).hexdigest()
 
-    @staticmethod
-    def email() -> str:
-        names = ["alice", "bob", "charlie", "diana", "eve", "frank"]
-        domains = ["example.com", "company.com", "org.com"]
-        return f"{random.choice(names)}.{random.choice(names)}@{random.choice(domains)}"
+# Digests are never checked, so random hex of the right length will do; drawn
+# from rng (not secrets) to stay reproducible under the seed
+def _sha1(rng: random.Random) -> str:
+    return '%040x' % rng.getrandbits(160)
 
-    @staticmethod
-    def git_branch() -> str:
-        return random.choice([
-            "main", "master", "develop", "staging",
-            "feature/auth", "feature/api", "bugfix/security",
-            "release/v1.0", "hotfix/critical"
-        ])
 
-    @staticmethod
-    def command() -> List[str]:
-        commands = [
-            ["go", "build", "-o", "myapp"],
-            ["go", "test", "./..."],
-            ["npm", "run", "build"],
-            ["make", "all"],
-            ["docker", "build", "-t", "app:latest", "."],
-            ["python", "setup.py", "install"],
-            ["cargo", "build", "--release"],
-        ]
-        return random.choice(commands)
+def _sha256(rng: random.Random) -> str:
+    return '%064x' % rng.getrandbits(256)
 
-    @staticmethod
-    def hostname() -> str:
-        prefixes = ["build", "ci", "runner", "agent"]
-        suffixes = ["01", "02", "prod", "dev"]
-        return f"{random.choice(prefixes)}-{random.choice(suffixes)}.company.com"
 
-    @staticmethod
-    def os_name() -> str:
-        return random.choice(["linux", "darwin", "windows"])
+def _email(rng: random.Random) -> str:
+    return f"{rng.choice(_NAMES)}.{rng.choice(_NAMES)}@{rng.choice(_DOMAINS)}"
 
-    @staticmethod
-    def file_path() -> str:
-        files = [
-            "main.go", "app.py", "index.js", "Makefile", "Dockerfile",
-            "package.json", "go.mod", "requirements.txt", "README.md"
-        ]
-        return random.choice(files)
+
+def _git_branch(rng: random.Random) -> str:
+    return rng.choice(_BRANCHES)
+
+
+def _command(rng: random.Random) -> List[str]:
+    return rng.choice(_COMMANDS)
+
+
+def _hostname(rng: random.Random) -> str:
+    return f"{rng.choice(_HOST_PREFIXES)}-{rng.choice(_HOST_SUFFIXES)}.company.com"
+
+
+def _os_name(rng: random.Random) -> str:
+    return rng.choice(_OS_NAMES)
+
+
+def _file_path(rng: random.Random) -> str:
+    return rng.choice(_FILES)
 
 
 class AttestorSchemas:
     """Schema definitions for all Witness attestors"""
 
     @staticmethod
-    def git() -> Dict[str, Any]:
+    def git(rng: random.Random) -> Dict[str, Any]:
         """Generate git attestor data"""
-        fake = FakeDataGenerator()
-        author = fake.email()
+        author = _email(rng)
         return {
             "type": "https://witness.dev/attestations/git/v0.1",
             "attestation": {
-                "commithash": fake.sha1(),
-                "branch": fake.git_branch(),
+                "commithash": _sha1(rng),
+                "branch": _git_branch(rng),
                 "author": author.split('@')[0],
                 "authoremail": author,
                 "committername": author.split('@')[0],
                 "committeremail": author,
-                "commitmessage": random.choice([
-                    "feat: add new feature",
-                    "fix: resolve bug",
-                    "chore: update dependencies",
-                    "refactor: improve code structure"
-                ]),
-                "status": {} if random.random() > 0.3 else {
+                "commitmessage": rng.choice(_COMMIT_MESSAGES),
+                "status": {} if rng.random() > 0.3 else {
                     "modified.go": {"worktree": "modified"}
                 },
-                "signature": "" if random.random() > 0.5 else "-----BEGIN PGP SIGNATURE-----\n...",
+                "signature": "" if rng.random() > 0.5 else "-----BEGIN PGP SIGNATURE-----\n...",
                 "remotes": ["https://github.com/org/repo.git"]
             }
         }
 
     @staticmethod
-    def commandrun() -> Dict[str, Any]:
+    def commandrun(rng: random.Random) -> Dict[str, Any]:
         """Generate commandrun attestor data"""
-        fake = FakeDataGenerator()
-        cmd = fake.command()
-        exitcode = random.choice([0, 0, 0, 0, 1])  # 80% success rate
+        cmd = _command(rng)
+        exitcode = int(rng.random() < 0.2)  # 80% success rate
 
         return {
             "type": "https://witness.dev/attestations/command-run/v0.1",
@@ -134,15 +157,14 @@ class AttestorSchemas:
         }
 
     @staticmethod
-    def environment() -> Dict[str, Any]:
+    def environment(rng: random.Random) -> Dict[str, Any]:
         """Generate environment attestor data"""
-        fake = FakeDataGenerator()
         return {
             "type": "https://witness.dev/attestations/environment/v0.1",
             "attestation": {
-                "os": fake.os_name(),
-                "hostname": fake.hostname(),
-                "username": random.choice(["runner", "ci", "buildbot"]),
+                "os": _os_name(rng),
+                "hostname": _hostname(rng),
+                "username": rng.choice(_USERNAMES),
                 "variables": {
                     "CI": "true",
                     "PATH": "/usr/local/bin:/usr/bin:/bin",
@@ -152,14 +174,13 @@ class AttestorSchemas:
         }
 
     @staticmethod
-    def material() -> Dict[str, Any]:
+    def material(rng: random.Random) -> Dict[str, Any]:
         """Generate material attestor data"""
-        fake = FakeDataGenerator()
-        num_files = random.randint(3, 10)
+        num_files = rng.randint(3, 10)
         materials = {}
         for _ in range(num_files):
-            materials[fake.file_path()] = {
-                f"sha256:{fake.sha256()}": {}
+            materials[_file_path(rng)] = {
+                f"sha256:{_sha256(rng)}": {}
             }
 
         return {
@@ -168,16 +189,15 @@ class AttestorSchemas:
         }
 
     @staticmethod
-    def product() -> Dict[str, Any]:
+    def product(rng: random.Random) -> Dict[str, Any]:
         """Generate product attestor data"""
-        fake = FakeDataGenerator()
         products = {
-            "myapp": {f"sha256:{fake.sha256()}": {}},
+            "myapp": {f"sha256:{_sha256(rng)}": {}},
         }
 
         # Sometimes include additional artifacts
-        if random.random() > 0.5:
-            products["myapp.tar.gz"] = {f"sha256:{fake.sha256()}": {}}
+        if rng.random() > 0.5:
+            products["myapp.tar.gz"] = {f"sha256:{_sha256(rng)}": {}}
 
         return {
             "type": "https://witness.dev/attestations/product/v0.1",
@@ -185,15 +205,15 @@ class AttestorSchemas:
         }
 
     @staticmethod
-    def github() -> Dict[str, Any]:
+    def github(rng: random.Random) -> Dict[str, Any]:
         """Generate GitHub Actions attestor data"""
         return {
             "type": "https://witness.dev/attestations/github/v0.1",
             "attestation": {
                 "repository": "org/repo",
                 "workflow": "build.yml",
-                "runid": str(random.randint(1000000, 9999999)),
-                "actor": FakeDataGenerator().email().split('@')[0],
+                "runid": str(rng.randint(1000000, 9999999)),
+                "actor": _email(rng).split('@')[0],
             }
         }
 
@@ -301,19 +321,65 @@ class RegoGenerator:
         return "\n".join(rules)
 
 
+ATTESTOR_TYPES = ("git", "commandrun", "environment", "material", "product", "github")
+ATTESTOR_FUNCS = {name: getattr(AttestorSchemas, name) for name in ATTESTOR_TYPES}
+ATTESTATION_TYPE_URLS = {
+    "git": "https://witness.dev/attestations/git/v0.1",
+    "commandrun": "https://witness.dev/attestations/command-run/v0.1",
+    "environment": "https://witness.dev/attestations/environment/v0.1",
+    "material": "https://witness.dev/attestations/material/v0.1",
+    "product": "https://witness.dev/attestations/product/v0.1",
+    "github": "https://witness.dev/attestations/github/v0.1",
+}
+RULE_FUNCS = {
+    "git": RegoGenerator.git_rules,
+    "commandrun": RegoGenerator.commandrun_rules,
+    "environment": RegoGenerator.environment_rules,
+}
+
+# Attestors per step of the multi-step pipeline scenario
+PIPELINE_STEPS = {
+    "build": ("git", "commandrun", "product"),
+    "test": ("material", "commandrun"),
+    "package": ("material", "product"),
+}
+
+
+_KEYID_PLACEHOLDER = "@KEYID@"
+
+# The multi-step policy has a fixed shape, so it is pretty-printed once and
+# only the key id is filled in per example
+MULTI_STEP_POLICY_JSON = _pretty({
+    "expires": _EXPIRES,
+    "publickeys": {
+        "ci-key": {
+            "keyid": f"sha256:{_KEYID_PLACEHOLDER}",
+            "key": "-----BEGIN PUBLIC KEY-----\n...\n-----END PUBLIC KEY-----"
+        }
+    },
+    "steps": {
+        step_name: {
+            "name": step_name,
+            "attestations": [{"type": ATTESTATION_TYPE_URLS[a]} for a in attestor_list],
+            "functionaries": [{"type": "publickey", "publickeyid": "ci-key"}]
+        }
+        for step_name, attestor_list in PIPELINE_STEPS.items()
+    }
+})
+
+
 class PolicyGenerator:
     """Generate policy documents from attestations"""
 
     @staticmethod
-    def generate_policy(step_name: str, attestors: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def generate_policy(step_name: str, attestors: List[Dict[str, Any]], rng: random.Random) -> Dict[str, Any]:
         """Generate a policy document for given attestations"""
-        fake = FakeDataGenerator()
 
         policy = {
-            "expires": (datetime.now() + timedelta(days=365)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "expires": _EXPIRES,
             "publickeys": {
                 "build-key": {
-                    "keyid": f"sha256:{fake.sha256()}",
+                    "keyid": f"sha256:{_sha256(rng)}",
                     "key": "-----BEGIN PUBLIC KEY-----\n...\n-----END PUBLIC KEY-----"
                 }
             },
@@ -339,43 +405,35 @@ class PolicyGenerator:
 class SyntheticExampleGenerator:
     """Main generator that creates complete training examples"""
 
-    def __init__(self):
-        self.attestor_schemas = AttestorSchemas()
-        self.rego_generator = RegoGenerator()
-        self.policy_generator = PolicyGenerator()
+    def __init__(self, seed: int = 42):
+        self.rng = random.Random(seed)
 
     def generate_single_step_example(self) -> Dict[str, Any]:
         """Generate a single-step attestation scenario"""
         # Pick 1-5 random attestors
-        attestor_types = ["git", "commandrun", "environment", "material", "product", "github"]
-        num_attestors = random.randint(1, 5)
-        selected = random.sample(attestor_types, num_attestors)
+        num_attestors = self.rng.randint(1, 5)
+        selected = self.rng.sample(ATTESTOR_TYPES, num_attestors)
 
         # Generate attestations
-        attestations = []
-        for attestor_type in selected:
-            if hasattr(self.attestor_schemas, attestor_type):
-                attestations.append(getattr(self.attestor_schemas, attestor_type)())
+        attestations = [ATTESTOR_FUNCS[attestor_type](self.rng) for attestor_type in selected]
 
         # Generate policy
-        policy = self.policy_generator.generate_policy("build", attestations)
+        policy = PolicyGenerator.generate_policy("build", attestations, self.rng)
 
         # Generate Rego rules for first attestor
         rego_rules = ""
         if attestations:
             first_att = attestations[0]
-            attestor_name = first_att["type"].split("/")[-2]
-            if hasattr(self.rego_generator, f"{attestor_name}_rules"):
-                rego_rules = getattr(self.rego_generator, f"{attestor_name}_rules")(
-                    first_att["attestation"]
-                )
+            rules = RULE_FUNCS.get(first_att["type"].split("/")[-2])
+            if rules is not None:
+                rego_rules = rules(first_att["attestation"])
 
         # Create user prompt
         attestor_list = ", ".join(selected)
         user_prompt = f"How do I create a witness policy for a build step that uses these attestors: {attestor_list}?"
 
         # Create assistant response
-        policy_json = json.dumps(policy, indent=2)
+        policy_json = _pretty(policy)
         assistant_response = f"""Here's a complete witness policy for your build step with {attestor_list} attestors:
 
 **Policy Document:**
@@ -409,7 +467,7 @@ witness verify \\
 
         return {
             "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
+                SYSTEM_MSG,
                 {"role": "user", "content": user_prompt},
                 {"role": "assistant", "content": assistant_response}
             ]
@@ -417,40 +475,10 @@ witness verify \\
 
     def generate_multi_step_example(self) -> Dict[str, Any]:
         """Generate a multi-step pipeline scenario"""
-        # Define pipeline steps
-        steps = {
-            "build": ["git", "commandrun", "product"],
-            "test": ["material", "commandrun"],
-            "package": ["material", "product"]
-        }
-
-        # Generate policy for all steps
-        policy = {
-            "expires": (datetime.now() + timedelta(days=365)).strftime("%Y-%m-%dT%H:%M:%SZ"),
-            "publickeys": {
-                "ci-key": {
-                    "keyid": f"sha256:{FakeDataGenerator().sha256()}",
-                    "key": "-----BEGIN PUBLIC KEY-----\n...\n-----END PUBLIC KEY-----"
-                }
-            },
-            "steps": {}
-        }
-
-        for step_name, attestor_list in steps.items():
-            attestations = []
-            for attestor_type in attestor_list:
-                if hasattr(self.attestor_schemas, attestor_type):
-                    attestations.append(getattr(self.attestor_schemas, attestor_type)())
-
-            policy["steps"][step_name] = {
-                "name": step_name,
-                "attestations": [{"type": att["type"]} for att in attestations],
-                "functionaries": [{"type": "publickey", "publickeyid": "ci-key"}]
-            }
+        policy_json = MULTI_STEP_POLICY_JSON.replace(_KEYID_PLACEHOLDER, _sha256(self.rng))
 
         user_prompt = "How do I create a multi-step witness policy for a build → test → package pipeline?"
 
-        policy_json = json.dumps(policy, indent=2)
         assistant_response = f"""Here's a complete multi-step witness policy for your pipeline:
 
 **Policy Document:**
@@ -489,7 +517,7 @@ witness verify \\
 
         return {
             "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
+                SYSTEM_MSG,
                 {"role": "user", "content": user_prompt},
                 {"role": "assistant", "content": assistant_response}
             ]
@@ -518,10 +546,44 @@ witness verify \\
         return examples
 
 
+def chunk_jobs(num_examples: int, seed: int) -> List[tuple]:
+    """(multi_step, seed, count) per chunk: 70% single-step, 30% multi-step"""
+    single_step_count = int(num_examples * 0.7)
+    multi_step_count = num_examples - single_step_count
+
+    jobs = []
+    for multi_step, total in ((False, single_step_count), (True, multi_step_count)):
+        for start in range(0, total, CHUNK_SIZE):
+            jobs.append((multi_step, seed + len(jobs), min(CHUNK_SIZE, total - start)))
+    return jobs
+
+
+def generate_chunk(job: tuple) -> List[bytes]:
+    """Worker: encoded JSONL rows for one chunk of examples
+
+    Every chunk seeds its own generator, so the output depends only on the
+    base seed, not on how many workers ran or which one got the chunk.
+    """
+    multi_step, seed, count = job
+    generator = SyntheticExampleGenerator(seed)
+    if multi_step:
+        return [_dumps(generator.generate_multi_step_example()) for _ in range(count)]
+    return [_dumps(generator.generate_single_step_example()) for _ in range(count)]
+
+
+def write_rows(path: Path, rows: List[bytes], batch: int = 4096) -> None:
+    """Write encoded rows as JSONL, joined into one write per batch of rows"""
+    with open(path, 'wb', buffering=1 << 20) as f:
+        for start in range(0, len(rows), batch):
+            f.write(b'\n'.join(rows[start:start + batch]) + b'\n')
+
+
 def main():
     parser = argparse.ArgumentParser(description="Generate synthetic Witness training data")
     parser.add_argument("--examples", type=int, default=1000, help="Number of examples to generate")
     parser.add_argument("--output", type=str, default="data/synthetic", help="Output directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--seed", type=int, default=42, help="Base random seed")
     args = parser.parse_args()
 
     print("=" * 80)
@@ -534,12 +596,17 @@ def main():
     output_dir = Path(args.output)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    # Generate examples
-    generator = SyntheticExampleGenerator()
-    examples = generator.generate_examples(args.examples)
+    # Generate examples across worker processes; fork keeps startup cheap
+    # where it is available (not on Windows)
+    ctx = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+    examples = []
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=ctx) as pool:
+        for rows in pool.map(generate_chunk, chunk_jobs(args.examples, args.seed)):
+            examples.extend(rows)
+            print(f"  {len(examples)}/{args.examples}")
 
     # Shuffle for better training
-    random.shuffle(examples)
+    random.Random(args.seed).shuffle(examples)
 
     # Split into train/val (90/10)
     split_idx = int(len(examples) * 0.9)
@@ -548,15 +615,11 @@ def main():
 
     # Write train set
     train_file = output_dir / "train.jsonl"
-    with open(train_file, 'w') as f:
-        for ex in train_examples:
-            f.write(json.dumps(ex) + '\n')
+    write_rows(train_file, train_examples)
 
     # Write validation set
     val_file = output_dir / "valid.jsonl"
-    with open(val_file, 'w') as f:
-        for ex in val_examples:
-            f.write(json.dumps(ex) + '\n')
+    write_rows(val_file, val_examples)
 
     print()
     print("=" * 80)
@@ -9,10 +9,25 @@ Checks:
 - No duplicate examples
 """
 
+import hashlib
 import json
+import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Set
+from typing import List, Dict, Optional, Set
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+_MISSING = object()
+_EXPECTED_ROLES = ("system", "user", "assistant")
+# Everything validate_content_quality looks for, found in one pass
+_QUALITY_RE = re.compile(r"```|witness run|witness verify")
 
 
 class DatasetValidator:
@@ -21,15 +36,21 @@ class DatasetValidator:
         self.errors = []
         self.warnings = []
         self.total_examples = 0
-        self.seen_prompts: Set[str] = set()
+        # 8-byte blake2b digests of user prompts rather than the prompts themselves
+        self.seen_prompts: Set[bytes] = set()
+        # Non-empty lines per file, recorded by validate_file for print_stats
+        self.line_counts: Dict[Path, int] = {}
+        # When set (in worker processes), duplicate checks are queued here as
+        # (warning index, file, line, digest, prompt) for the parent to resolve
+        self.deferred_prompts: Optional[List[tuple]] = None
 
     def validate_message_structure(self, example: Dict, file_path: Path, line_num: int) -> bool:
         """Validate message structure matches OpenAI format"""
-        if "messages" not in example:
+        messages = example.get("messages", _MISSING) if isinstance(example, dict) else _MISSING
+        if messages is _MISSING:
             self.errors.append(f"{file_path}:{line_num} - Missing 'messages' field")
             return False
 
-        messages = example["messages"]
         if not isinstance(messages, list):
             self.errors.append(f"{file_path}:{line_num} - 'messages' must be a list")
             return False
@@ -41,31 +62,32 @@ class DatasetValidator:
             return False
 
         # Validate roles
-        expected_roles = ["system", "user", "assistant"]
-        for i, (msg, expected_role) in enumerate(zip(messages, expected_roles)):
+        for i, (msg, expected_role) in enumerate(zip(messages, _EXPECTED_ROLES)):
             if not isinstance(msg, dict):
                 self.errors.append(f"{file_path}:{line_num} - Message {i} is not a dict")
                 return False
 
-            if "role" not in msg:
+            role = msg.get("role", _MISSING)
+            if role is _MISSING:
                 self.errors.append(f"{file_path}:{line_num} - Message {i} missing 'role'")
                 return False
 
-            if msg["role"] != expected_role:
+            if role != expected_role:
                 self.errors.append(
-                    f"{file_path}:{line_num} - Message {i} has role '{msg['role']}', expected '{expected_role}'"
+                    f"{file_path}:{line_num} - Message {i} has role '{role}', expected '{expected_role}'"
                 )
                 return False
 
-            if "content" not in msg:
+            content = msg.get("content", _MISSING)
+            if content is _MISSING:
                 self.errors.append(f"{file_path}:{line_num} - Message {i} missing 'content'")
                 return False
 
-            if not isinstance(msg["content"], str):
+            if not isinstance(content, str):
                 self.errors.append(f"{file_path}:{line_num} - Message {i} content must be string")
                 return False
 
-            if len(msg["content"].strip()) == 0:
+            if not content.strip():
                 self.errors.append(f"{file_path}:{line_num} - Message {i} content is empty")
                 return False
 
@@ -74,48 +96,65 @@ class DatasetValidator:
     def check_duplicate(self, example: Dict, file_path: Path, line_num: int):
         """Check for duplicate user prompts"""
         user_prompt = example["messages"][1]["content"]
+        digest = hashlib.blake2b(user_prompt.encode(), digest_size=8).digest()
+
+        if self.deferred_prompts is not None:
+            self.deferred_prompts.append((len(self.warnings), file_path, line_num, digest, user_prompt[:50]))
+        else:
+            self.record_prompt(digest, user_prompt[:50], file_path, line_num)
 
-        if user_prompt in self.seen_prompts:
-            self.warnings.append(f"{file_path}:{line_num} - Duplicate user prompt: '{user_prompt[:50]}...'")
+    def record_prompt(self, digest: bytes, prompt_prefix: str, file_path: Path, line_num: int):
+        """Warn if a prompt digest was already seen, otherwise remember it"""
+        if digest in self.seen_prompts:
+            self.warnings.append(f"{file_path}:{line_num} - Duplicate user prompt: '{prompt_prefix}...'")
         else:
-            self.seen_prompts.add(user_prompt)
+            self.seen_prompts.add(digest)
 
     def validate_content_quality(self, example: Dict, file_path: Path, line_num: int):
         """Validate content quality"""
         assistant_msg = example["messages"][2]["content"]
 
-        # Check for code blocks
-        if "```" in assistant_msg:
-            # Ensure code blocks are properly closed
-            if assistant_msg.count("```") % 2 != 0:
-                self.errors.append(f"{file_path}:{line_num} - Unclosed code block in assistant response")
+        fences = 0
+        has_command = False
+        for match in _QUALITY_RE.finditer(assistant_msg):
+            if match.group() == "```":
+                fences += 1
+            else:
+                has_command = True
+
+        # Ensure code blocks are properly closed
+        if fences % 2 != 0:
+            self.errors.append(f"{file_path}:{line_num} - Unclosed code block in assistant response")
 
         # Check minimum length
         if len(assistant_msg) < 100:
             self.warnings.append(f"{file_path}:{line_num} - Assistant response is very short ({len(assistant_msg)} chars)")
 
         # Check for witness commands
-        if "witness run" not in assistant_msg and "witness verify" not in assistant_msg:
+        if not has_command:
             self.warnings.append(f"{file_path}:{line_num} - No witness commands in response")
 
-    def validate_file(self, file_path: Path) -> int:
+    def validate_file(self, file_path: Path, quiet: bool = False) -> int:
         """Validate a single JSONL file"""
-        print(f"Validating {file_path.relative_to(self.data_dir.parent)}...")
+        if not quiet:
+            print(f"Validating {file_path.relative_to(self.data_dir.parent)}...")
 
         if not file_path.exists():
             self.errors.append(f"{file_path} - File does not exist")
             return 0
 
         examples_count = 0
+        line_count = 0
 
-        with open(file_path, 'r') as f:
+        with open(file_path, 'rb') as f:
             for line_num, line in enumerate(f, 1):
                 line = line.strip()
                 if not line:
                     continue
+                line_count += 1
 
                 try:
-                    example = json.loads(line)
+                    example = _loads(line)
                 except json.JSONDecodeError as e:
                     self.errors.append(f"{file_path}:{line_num} - Invalid JSON: {e}")
                     continue
@@ -126,23 +165,47 @@ class DatasetValidator:
                     examples_count += 1
 
         self.total_examples += examples_count
-        print(f"  ✓ {examples_count} examples")
+        self.line_counts[file_path] = line_count
+        if not quiet:
+            print(f"  ✓ {examples_count} examples")
         return examples_count
 
+    def merge_file_result(self, file_path: Path, result: tuple):
+        """Fold a worker's validate_file result into this validator, in file order"""
+        examples_count, line_count, errors, warnings, prompts = result
+        print(f"Validating {file_path.relative_to(self.data_dir.parent)}...")
+
+        self.errors.extend(errors)
+        # Resolve duplicates against everything merged so far, slotting each
+        # warning back where a sequential run would have raised it
+        done = 0
+        for index, path, line_num, digest, prompt_prefix in prompts:
+            self.warnings.extend(warnings[done:index])
+            done = index
+            self.record_prompt(digest, prompt_prefix, path, line_num)
+        self.warnings.extend(warnings[done:])
+
+        self.total_examples += examples_count
+        self.line_counts[file_path] = line_count
+        print(f"  ✓ {examples_count} examples")
+
     def validate_all(self):
         """Validate all JSONL files"""
         print("Validating Witness training dataset...")
         print("=" * 60)
 
         # Find all JSONL files
-        jsonl_files = list(self.data_dir.rglob("*.jsonl"))
+        jsonl_files = _find_jsonl_files(self.data_dir)
 
         if not jsonl_files:
             self.errors.append(f"No JSONL files found in {self.data_dir}")
             return False
 
-        for jsonl_file in sorted(jsonl_files):
-            self.validate_file(jsonl_file)
+        # Parsing is CPU-bound and independent per file, so spread the files
+        # over worker processes and merge the results back in sorted order
+        with ProcessPoolExecutor() as ex:
+            for jsonl_file, result in zip(jsonl_files, ex.map(_validate_one, jsonl_files)):
+                self.merge_file_result(jsonl_file, result)
 
         print("=" * 60)
         print(f"Total examples: {self.total_examples}")
@@ -167,15 +230,46 @@ class DatasetValidator:
         print("\nDataset Statistics:")
         print("-" * 60)
 
-        # Count examples per file
-        for jsonl_file in sorted(self.data_dir.rglob("*.jsonl")):
-            with open(jsonl_file, 'r') as f:
-                count = sum(1 for line in f if line.strip())
+        # Count examples per file (lines counted while validating)
+        for jsonl_file, count in sorted(self.line_counts.items()):
             category = jsonl_file.parent.name
             filename = jsonl_file.stem
             print(f"  {category}/{filename}: {count} examples")
 
 
+def _find_jsonl_files(root: Path) -> List[Path]:
+    """Sorted .jsonl files under root, found with one os.scandir walk"""
+    found = []
+    stack = [str(root)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir():
+                    stack.append(entry.path)
+                elif entry.name.endswith(".jsonl"):
+                    found.append(Path(entry.path))
+    found.sort()
+    return found
+
+
+def _validate_one(file_path: Path) -> tuple:
+    """Worker: validate one file on its own, leaving duplicate checks to the parent"""
+    validator = DatasetValidator(file_path.parent)
+    validator.deferred_prompts = []
+    examples_count = validator.validate_file(file_path, quiet=True)
+    return (
+        examples_count,
+        validator.line_counts.get(file_path, 0),
+        validator.errors,
+        validator.warnings,
+        validator.deferred_prompts,
+    )
+
+
 if __name__ == "__main__":
     script_dir = Path(__file__).parent
     data_dir = script_dir.parent / "data"
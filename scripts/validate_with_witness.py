@@ -17,32 +17,57 @@ import tempfile
 from pathlib import Path
 import sys
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# A `witness run`/`witness verify` line, minus its leading whitespace
+_WITNESS_LINE_RE = re.compile(r'^\s*(witness (?:run|verify)[^\n]*)', re.MULTILINE)
+
+def _iter_fenced(text: str, lang: str):
+    """Bodies of the ```lang fenced blocks in text, found with str.find"""
+    opener = f'```{lang}\n'
+    i = 0
+    while True:
+        start = text.find(opener, i)
+        if start == -1:
+            return
+        body = start + len(opener)
+        end = text.find('```', body)
+        if end == -1:
+            return
+        yield text[body:end]
+        i = end + 3
+
 def extract_witness_commands(assistant_response):
     """Extract witness run/verify commands from assistant response"""
     # Find bash code blocks
-    bash_blocks = re.findall(r'```bash\n(.*?)```', assistant_response, re.DOTALL)
-
-    witness_commands = []
-    for block in bash_blocks:
-        # Find witness commands
-        for line in block.split('\n'):
-            line = line.strip()
-            if line.startswith('witness run') or line.startswith('witness verify'):
-                witness_commands.append(line)
+    bash_blocks = _iter_fenced(assistant_response, 'bash')
 
-    return witness_commands
+    # Find witness commands
+    return [
+        m.group(1).rstrip()
+        for block in bash_blocks
+        for m in _WITNESS_LINE_RE.finditer(block)
+    ]
 
 def extract_policy_json(assistant_response):
     """Extract policy JSON from assistant response"""
     # Find JSON code blocks
-    json_blocks = re.findall(r'```json\n(.*?)```', assistant_response, re.DOTALL)
+    json_blocks = _iter_fenced(assistant_response, 'json')
 
     for block in json_blocks:
+        # A policy has "steps" or "publickeys" keys; skip parsing blocks that
+        # can't contain either
+        if '"steps"' not in block and '"publickeys"' not in block:
+            continue
         try:
-            policy = json.loads(block)
+            policy = _loads(block)
             if 'steps' in policy or 'publickeys' in policy:
                 return policy
-        except:
+        except (ValueError, TypeError):
             continue
 
     return None
@@ -74,33 +99,30 @@ def validate_policy_json(policy):
 
     return issues
 
+# Flags each witness verb needs: (any of these substrings, issue if none is present)
+_REQUIRED_FLAGS = {
+    'run': (
+        (('--step',), "Missing --step flag"),
+        (('--attestations',), "Missing --attestations flag"),
+        (('-o ', '--outfile'), "Missing output file flag"),
+        (('--key',), "Missing --key flag"),
+        ((' -- ',), "Missing command separator ' -- '"),
+    ),
+    'verify': (
+        (('--policy',), "Missing --policy flag"),
+        (('--publickey',), "Missing --publickey flag"),
+        (('-a ',), "Missing attestation file flag (-a)"),
+    ),
+}
+
 def test_witness_command_syntax(command):
     """Test if witness command has valid syntax"""
-    issues = []
+    parts = command.split(None, 2)
+    if len(parts) < 2 or parts[0] != 'witness':
+        return []
+    checks = _REQUIRED_FLAGS.get(parts[1], ())
 
-    # Check for required flags in witness run
-    if command.startswith('witness run'):
-        if '--step' not in command:
-            issues.append("Missing --step flag")
-        if '--attestations' not in command:
-            issues.append("Missing --attestations flag")
-        if '-o ' not in command and '--outfile' not in command:
-            issues.append("Missing output file flag")
-        if '--key' not in command:
-            issues.append("Missing --key flag")
-        if ' -- ' not in command:
-            issues.append("Missing command separator ' -- '")
-
-    # Check for required flags in witness verify
-    if command.startswith('witness verify'):
-        if '--policy' not in command:
-            issues.append("Missing --policy flag")
-        if '--publickey' not in command:
-            issues.append("Missing --publickey flag")
-        if '-a ' not in command:
-            issues.append("Missing attestation file flag (-a)")
-
-    return issues
+    return [issue for tokens, issue in checks if not any(t in command for t in tokens)]
 
 def validate_training_example(example_num, example):
     """Validate a single training example"""
@@ -169,22 +191,28 @@ def main():
 
     print(f"\nLoading training data from: {train_file}")
 
-    with open(train_file, 'r') as f:
-        examples = [json.loads(line) for line in f]
+    # Reservoir-sample 10 raw lines while streaming; only those get parsed
+    import random
+    rng = random.Random(42)
+    sampled = []
+    total = 0
+    with open(train_file, 'rb') as f:
+        for total, line in enumerate(f, 1):
+            if total <= 10:
+                sampled.append((total, line))
+            else:
+                j = rng.randint(0, total - 1)
+                if j < 10:
+                    sampled[j] = (total, line)
 
-    print(f"Loaded {len(examples)} examples")
+    print(f"Loaded {total} examples")
     print(f"\nValidating sample of 10 examples...")
 
-    # Validate a sample of examples
-    import random
-    random.seed(42)
-    sample_indices = random.sample(range(len(examples)), min(10, len(examples)))
-
     total_issues = []
     valid_count = 0
 
-    for idx in sample_indices:
-        issues = validate_training_example(idx + 1, examples[idx])
+    for example_num, line in sampled:
+        issues = validate_training_example(example_num, _loads(line))
         if not issues:
             valid_count += 1
         total_issues.extend(issues)
@@ -193,12 +221,12 @@ def main():
     print(f"\n{'='*80}")
     print(f"Validation Summary")
     print(f"{'='*80}")
-    print(f"Examples validated: {len(sample_indices)}")
+    print(f"Examples validated: {len(sampled)}")
     print(f"Valid examples: {valid_count}")
-    print(f"Examples with issues: {len(sample_indices) - valid_count}")
+    print(f"Examples with issues: {len(sampled) - valid_count}")
     print(f"Total issues found: {len(total_issues)}")
 
-    if valid_count == len(sample_indices):
+    if valid_count == len(sampled):
         print(f"\n✅ All sampled examples are valid!")
     else:
         print(f"\n⚠️  Some examples have issues (see details above)")
@@ -12,50 +12,169 @@ Tests every Rego policy in training data with OPA (Open Policy Agent):
 This is critical - invalid Rego would teach the model bad syntax.
 """
 
+import atexit
+import hashlib
 import json
+import os
+import re
+import shutil
 import subprocess
 import tempfile
-import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Dict, List, Tuple
+
+from _opa import OpaServer
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    from tqdm import tqdm
+    _log = tqdm.write
+except ImportError:
+    tqdm = None
+    _log = print
+
+# Rego blocks checked together by one `opa check` + one `opa eval`
+REGO_BATCH_SIZE = 32
+
+_PACKAGE_RE = re.compile(r'^package\s+', re.MULTILINE)
+_BATCH_FILE_RE = re.compile(r'policy_(\d+)\.rego')
+
+# OPA verdict per distinct Rego block (blake2b of its source), for this run;
+# template-generated datasets repeat the same blocks many times
+_REGO_CACHE: Dict[bytes, Tuple[bool, str]] = {}
+
+# One scratch directory per thread, reused by every opa CLI check in it
+_scratch = threading.local()
+
+def _scratch_dir() -> Path:
+    path = getattr(_scratch, 'path', None)
+    if path is None:
+        path = _scratch.path = Path(tempfile.mkdtemp(prefix='verify-rego-'))
+        atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+def _iter_fenced(text: str, lang: str):
+    """Bodies of the ```lang fenced blocks in text, found with str.find"""
+    opener = f'```{lang}\n'
+    i = 0
+    while True:
+        start = text.find(opener, i)
+        if start == -1:
+            return
+        body = start + len(opener)
+        end = text.find('```', body)
+        if end == -1:
+            return
+        yield text[body:end]
+        i = end + 3
 
 def extract_rego_blocks(text: str) -> List[str]:
     """Extract all Rego code blocks from text"""
-    # Match ```rego ... ``` blocks
-    rego_blocks = re.findall(r'```rego\n(.*?)```', text, re.DOTALL)
-    return rego_blocks
+    return list(_iter_fenced(text, 'rego'))
+
+# `opa eval` compiles the policy first: parse/compile failures come back as
+# rego_*_error codes, evaluation failures as eval_*_error
+_COMPILE_ERROR_RE = re.compile(r'\brego_\w+_error\b')
+
+def _eval_failure(stderr: str) -> str:
+    """Message for a failed `opa eval`, "Syntax error: ..." or "Eval error: ..." """
+    kind = "Syntax error" if _COMPILE_ERROR_RE.search(stderr) else "Eval error"
+    return f"{kind}: {stderr}"
 
 def verify_rego_syntax(rego_code: str) -> Tuple[bool, str]:
     """Verify Rego syntax with OPA"""
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.rego', delete=False) as f:
-        f.write(rego_code)
-        rego_file = f.name
+    rego_file = str(_scratch_dir() / "policy.rego")
+    Path(rego_file).write_text(rego_code)
 
-    try:
-        # Check syntax
-        result = subprocess.run(
-            ['opa', 'check', rego_file],
-            capture_output=True,
-            text=True
-        )
+    # Compile and evaluate with empty input; a separate `opa check` would
+    # only repeat the compile step
+    result = subprocess.run(
+        ['opa', 'eval', '-d', rego_file, '--stdin-input', 'data'],
+        input='{}',
+        capture_output=True,
+        text=True
+    )
 
-        if result.returncode != 0:
-            return False, f"Syntax error: {result.stderr}"
+    if result.returncode != 0:
+        return False, _eval_failure(result.stderr)
 
-        # Test evaluation with empty input
-        result = subprocess.run(
-            ['opa', 'eval', '-d', rego_file, '-i', '{}', 'data'],
-            capture_output=True,
-            text=True
-        )
+    return True, "Valid"
 
-        if result.returncode != 0:
-            return False, f"Eval error: {result.stderr}"
+def _failed_batch_files(result: subprocess.CompletedProcess, files: List[Path]) -> List[Path]:
+    """Files of a batched opa run that it reported errors for (all if unclear)"""
+    if result.returncode == 0:
+        return []
+    named = {int(n) for n in _BATCH_FILE_RE.findall(result.stderr)}
+    failed = [f for f in files if int(_BATCH_FILE_RE.search(f.name).group(1)) in named]
+    return failed or files
 
-        return True, "Valid"
+def verify_rego_batch(rego_codes: List[str]) -> List[Tuple[bool, str]]:
+    """verify_rego_syntax for many blocks with one `opa eval`
 
-    finally:
-        Path(rego_file).unlink()
+    Each block gets its own package prefix so they compile side by side.
+    Blocks that a batched run reports (or every block, when the error
+    can't be attributed) are re-checked on their own for the exact message.
+    """
+    results = [(True, "Valid")] * len(rego_codes)
+    if not rego_codes:
+        return results
+
+    # Files from earlier, larger batches may linger in the scratch dir; opa
+    # is only ever given this batch's files by name
+    files = []
+    for i, rego_code in enumerate(rego_codes):
+        rego_file = _scratch_dir() / f"policy_{i}.rego"
+        rego_file.write_text(_PACKAGE_RE.sub(f'package batch{i}.', rego_code, count=1))
+        files.append(rego_file)
+
+    # A compile error stops opa before evaluation, so after every failed run
+    # the files it didn't report are evaluated again without the failed ones
+    pending = files
+    while pending:
+        eval_args = ['opa', 'eval', '--stdin-input']
+        for f in pending:
+            eval_args += ['-d', str(f)]
+        result = subprocess.run(eval_args + ['data'], input='{}', capture_output=True, text=True)
+
+        failed = _failed_batch_files(result, pending)
+        if not failed:
+            break
+        for f in failed:
+            i = int(_BATCH_FILE_RE.search(f.name).group(1))
+            results[i] = verify_rego_syntax(rego_codes[i])
+        pending = [f for f in pending if f not in failed]
+    return results
+
+def verify_rego_cached(rego_codes: List[str],
+                       verify_blocks: Callable[[List[str]], List[Tuple[bool, str]]] = verify_rego_batch,
+                       mapper: Callable = map) -> List[Tuple[bool, str]]:
+    """Verdicts for rego_codes, verifying only blocks not seen before in this run
+
+    New blocks go to verify_blocks REGO_BATCH_SIZE at a time, with the
+    batches spread by mapper (e.g. a thread pool's map).
+    """
+    keys = [hashlib.blake2b(rego.encode(), digest_size=16).digest() for rego in rego_codes]
+    todo = {}
+    for key, rego in zip(keys, rego_codes):
+        if key not in _REGO_CACHE:
+            todo.setdefault(key, rego)
+
+    if todo:
+        codes = list(todo.values())
+        chunks = [codes[j:j + REGO_BATCH_SIZE] for j in range(0, len(codes), REGO_BATCH_SIZE)]
+        verdicts = [r for chunk in mapper(verify_blocks, chunks) for r in chunk]
+        _REGO_CACHE.update(zip(todo, verdicts))
+
+    return [_REGO_CACHE[key] for key in keys]
 
 def verify_training_example(example: Dict) -> Tuple[bool, List[str]]:
     """Verify all Rego in a training example"""
@@ -67,15 +186,38 @@ def verify_training_example(example: Dict) -> Tuple[bool, List[str]]:
         # No Rego in this example - that's fine
         return True, []
 
-    errors = []
-    for i, rego in enumerate(rego_blocks, 1):
-        valid, msg = verify_rego_syntax(rego)
-        if not valid:
-            errors.append(f"Block {i}: {msg}")
+    errors = [
+        f"Block {i}: {msg}"
+        for i, (valid, msg) in enumerate(verify_rego_cached(rego_blocks), 1)
+        if not valid
+    ]
 
     return len(errors) == 0, errors
 
-def verify_dataset(input_file: Path, output_file: Path):
+# Lines handed to the thread pool at a time; bounds memory while streaming
+BATCH_SIZE = 256
+
+def _verify_stream(lines, pool, verify_blocks: Callable[[List[str]], List[Tuple[bool, str]]]):
+    """(line, example, (valid, errors)) per input line, in input order
+
+    The Rego blocks of a whole batch of lines are pooled, verified through
+    verify_rego_cached on the thread pool and handed back to their examples.
+    """
+    for batch in iter(lambda: list(islice(lines, BATCH_SIZE)), []):
+        examples = [_loads(line) for line in batch]
+        blocks = [extract_rego_blocks(ex['messages'][2]['content']) for ex in examples]
+        flat = [rego for example_blocks in blocks for rego in example_blocks]
+        verdicts = iter(verify_rego_cached(flat, verify_blocks, pool.map))
+
+        for line, example, example_blocks in zip(batch, examples, blocks):
+            errors = [
+                f"Block {i}: {msg}"
+                for i, (valid, msg) in enumerate(islice(verdicts, len(example_blocks)), 1)
+                if not valid
+            ]
+            yield line, example, (len(errors) == 0, errors)
+
+def verify_dataset(input_file: Path, output_file: Path, workers: int = None):
     """Verify all Rego in dataset, only keep valid examples"""
     print("="*70)
     print("Formal Rego Policy Verification")
@@ -84,49 +226,61 @@ def verify_dataset(input_file: Path, output_file: Path):
     print(f"Output: {output_file}")
     print()
 
-    with open(input_file, 'r') as f:
-        examples = [json.loads(line) for line in f]
+    # Stream the input: accepted lines are written through unchanged, so only
+    # one batch of examples is held in memory at a time
+    with open(input_file, 'rb') as f:
+        total = sum(1 for _ in f)
 
-    print(f"Total examples: {len(examples)}")
+    print(f"Total examples: {total}")
 
-    verified_examples = []
+    verified_count = 0
     rego_count = 0
     valid_rego = 0
     invalid_rego = 0
 
-    for i, example in enumerate(examples, 1):
-        if i % 100 == 0:
-            print(f"  Progress: {i}/{len(examples)} (Valid Rego: {valid_rego}, Invalid: {invalid_rego})")
-
-        valid, errors = verify_training_example(example)
-
-        if valid:
-            verified_examples.append(example)
-            assistant_content = example['messages'][2]['content']
-            rego_blocks = extract_rego_blocks(assistant_content)
-            if rego_blocks:
-                valid_rego += len(rego_blocks)
-                rego_count += len(rego_blocks)
-        else:
-            invalid_rego += len(errors)
-            rego_count += len(errors)
-            if i <= 10:  # Show first few errors
-                print(f"  ❌ Example {i}: {errors[0]}")
-
-    # Save verified examples
+    # Checks wait on opa (the server, or CLI subprocesses without it), so
+    # threads overlap them fine; results come back in input order
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_file, 'w') as f:
-        for ex in verified_examples:
-            f.write(json.dumps(ex) + '\n')
+    with ExitStack() as stack:
+        try:
+            verify_blocks = stack.enter_context(OpaServer()).verify_batch
+        except (OSError, RuntimeError) as e:
+            print(f"  opa server unavailable ({e}), using batched opa CLI runs")
+            verify_blocks = verify_rego_batch
+
+        fin = stack.enter_context(open(input_file, 'rb'))
+        fout = stack.enter_context(open(output_file, 'wb'))
+        pool = stack.enter_context(ThreadPoolExecutor(max_workers=workers or os.cpu_count()))
+        results = enumerate(_verify_stream(fin, pool, verify_blocks), 1)
+        if tqdm is not None:
+            # Rate-limited bar; errors go through tqdm.write so they don't break it
+            results = tqdm(results, total=total, mininterval=0.5, unit='ex')
+        for i, (line, example, (valid, errors)) in results:
+            if tqdm is None and i % 100 == 0:
+                print(f"  Progress: {i}/{total} (Valid Rego: {valid_rego}, Invalid: {invalid_rego})")
+
+            if valid:
+                fout.write(line if line.endswith(b'\n') else line + b'\n')
+                verified_count += 1
+                assistant_content = example['messages'][2]['content']
+                rego_blocks = extract_rego_blocks(assistant_content)
+                if rego_blocks:
+                    valid_rego += len(rego_blocks)
+                    rego_count += len(rego_blocks)
+            else:
+                invalid_rego += len(errors)
+                rego_count += len(errors)
+                if i <= 10:  # Show first few errors
+                    _log(f"  ❌ Example {i}: {errors[0]}")
 
     print()
     print("="*70)
     print("Verification Complete!")
     print("="*70)
-    print(f"Total examples: {len(examples)}")
-    print(f"Verified examples: {len(verified_examples)}")
-    print(f"Rejected: {len(examples) - len(verified_examples)}")
-    print(f"Success rate: {len(verified_examples) * 100 / len(examples):.1f}%")
+    print(f"Total examples: {total}")
+    print(f"Verified examples: {verified_count}")
+    print(f"Rejected: {total - verified_count}")
+    print(f"Success rate: {verified_count * 100 / total:.1f}%")
     print()
     print(f"Total Rego blocks: {rego_count}")
     print(f"Valid Rego: {valid_rego}")
@@ -141,9 +295,10 @@ def main():
     parser = argparse.ArgumentParser(description="Verify Rego policies in training data")
     parser.add_argument("--input", required=True, help="Input JSONL file")
     parser.add_argument("--output", required=True, help="Output JSONL file (verified only)")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent OPA checks (default: CPU count)")
     args = parser.parse_args()
 
-    verify_dataset(Path(args.input), Path(args.output))
+    verify_dataset(Path(args.input), Path(args.output), args.workers)
 
 if __name__ == "__main__":
     main()
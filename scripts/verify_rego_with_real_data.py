@@ -13,22 +13,99 @@ Process:
 This ensures Rego policies teach valid patterns that work with actual witness attestations.
 """
 
+import atexit
 import json
+import os
+import re
+import shutil
 import subprocess
 import tempfile
-import re
+import threading
 import base64
+import functools
+import io
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Tuple
-
-def create_test_attestation(attestor: str, work_dir: Path) -> Tuple[Path, Dict]:
-    """Create a real attestation and return file + parsed JSON"""
-    # Create keys
-    key_pem = work_dir / "key.pem"
+from typing import Dict, List, Optional, Tuple
+
+from _opa import OpaServer
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    from tqdm import tqdm
+    _log = tqdm.write
+except ImportError:
+    tqdm = None
+    _log = print
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Attestors a question can be about, in detection priority order
+_ATTESTORS = ('git', 'environment', 'commandrun', 'github', 'gitlab', 'aws', 'gcp-iit')
+# Longer names first so "github"/"gitlab" aren't read as "git"
+_ATTESTOR_RE = re.compile(r'\b(github|gitlab|git|environment|commandrun|aws|gcp-iit)', re.IGNORECASE)
+
+# One scratch directory per thread, reused by every opa CLI check in it
+_scratch = threading.local()
+
+def _scratch_dir() -> Path:
+    path = getattr(_scratch, 'path', None)
+    if path is None:
+        path = _scratch.path = Path(tempfile.mkdtemp(prefix='verify-rego-'))
+        atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+def _iter_fenced(text: str, lang: str):
+    """Bodies of the ```lang fenced blocks in text, found with str.find"""
+    opener = f'```{lang}\n'
+    i = 0
+    while True:
+        start = text.find(opener, i)
+        if start == -1:
+            return
+        body = start + len(opener)
+        end = text.find('```', body)
+        if end == -1:
+            return
+        yield text[body:end]
+        i = end + 3
+
+@functools.lru_cache(maxsize=1)
+def _signing_key() -> Path:
+    """Ed25519 key all test attestations are signed with, generated once per process"""
+    key_dir = Path(tempfile.mkdtemp(prefix='verify-rego-key-'))
+    atexit.register(shutil.rmtree, key_dir, ignore_errors=True)
+    key_pem = key_dir / "key.pem"
     subprocess.run(
         ["openssl", "genpkey", "-algorithm", "ed25519", "-out", str(key_pem)],
         capture_output=True, check=True
     )
+    return key_pem
+
+# `opa eval` compiles the policy first: parse/compile failures come back as
+# rego_*_error codes, evaluation failures as eval_*_error
+_COMPILE_ERROR_RE = re.compile(r'\brego_\w+_error\b')
+
+def _eval_failure(stderr: str) -> str:
+    """Message for a failed `opa eval`, "Syntax error: ..." or "Eval error: ..." """
+    kind = "Syntax error" if _COMPILE_ERROR_RE.search(stderr) else "Eval error"
+    return f"{kind}: {stderr}"
+
+def create_test_attestation(attestor: str, work_dir: Path) -> Tuple[Path, Dict]:
+    """Create a real attestation and return file + parsed JSON"""
+    # The signature is never checked, so one key serves every attestation
+    key_pem = _signing_key()
 
     # Init git if needed
     if attestor == "git":
@@ -58,12 +135,21 @@ def create_test_attestation(attestor: str, work_dir: Path) -> Tuple[Path, Dict]:
         return None, None
 
     # Parse attestation to get predicate
-    with open(att_file, 'r') as f:
-        envelope = json.load(f)
+    envelope = _loads(att_file.read_bytes())
 
     # Decode payload to get attestation collection
     payload_b64 = envelope['payload']
-    payload_json = json.loads(base64.b64decode(payload_b64))
+    payload = base64.b64decode(payload_b64)
+
+    # With ijson, stream predicate.attestations and stop at the attestor's
+    # entry instead of building the whole collection
+    if ijson is not None:
+        for att in ijson.items(io.BytesIO(payload), 'predicate.attestations.item', use_float=True):
+            if attestor in att.get('type', ''):
+                return att_file, att.get('attestation', {})
+        return att_file, None
+
+    payload_json = _loads(payload)
 
     # Extract predicate (the collection)
     if 'predicate' not in payload_json:
@@ -83,90 +169,106 @@ def create_test_attestation(attestor: str, work_dir: Path) -> Tuple[Path, Dict]:
 
     return att_file, attestor_data
 
-def test_rego_against_data(rego_code: str, attestation_data: Dict) -> Tuple[bool, str]:
-    """Test Rego policy against real attestation data"""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        tmpdir = Path(tmpdir)
-
-        # Write Rego policy
-        rego_file = tmpdir / "policy.rego"
-        rego_file.write_text(rego_code)
-
-        # Write attestation data as input
-        input_file = tmpdir / "input.json"
-        with open(input_file, 'w') as f:
-            json.dump({"attestation": attestation_data}, f)
-
-        # Test syntax
-        result = subprocess.run(
-            ['opa', 'check', str(rego_file)],
-            capture_output=True,
-            text=True
-        )
-
-        if result.returncode != 0:
-            return False, f"Syntax error: {result.stderr}"
-
-        # Test evaluation with real data
-        result = subprocess.run(
-            ['opa', 'eval',
-             '-d', str(rego_file),
-             '-i', str(input_file),
-             'data'],
-            capture_output=True,
-            text=True
-        )
-
-        if result.returncode != 0:
-            return False, f"Eval error: {result.stderr}"
-
-        # Check if deny rules evaluated (presence indicates it ran)
-        if 'deny' in rego_code and 'data' in result.stdout:
-            try:
-                eval_result = json.loads(result.stdout)
-                # Rego evaluated successfully
-                return True, "Valid - evaluated against real attestation"
-            except:
-                return False, "Could not parse OPA output"
-
+# Attestation data per attestor: the test attestation only depends on the
+# attestor, so witness runs at most once for each
+_ATTESTATIONS: Dict[str, Optional[Dict]] = {}
+_ATTESTATIONS_LOCK = threading.Lock()
+
+def attestation_data(attestor: str) -> Optional[Dict]:
+    """Data of a test attestation for attestor (None if it can't be created)"""
+    with _ATTESTATIONS_LOCK:
+        if attestor not in _ATTESTATIONS:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                _, _ATTESTATIONS[attestor] = create_test_attestation(attestor, Path(tmpdir))
+        return _ATTESTATIONS[attestor]
+
+def test_rego_against_data(rego_code: str, attestation_data: Dict,
+                           opa: Optional[OpaServer] = None) -> Tuple[bool, str]:
+    """Test Rego policy against real attestation data (on opa if given, else the CLI)"""
+    if opa is not None:
+        valid, msg, _ = opa.evaluate(rego_code, {"attestation": attestation_data})
+        if not valid:
+            return False, msg
+        if 'deny' in rego_code:
+            return True, "Valid - evaluated against real attestation"
         return True, "Valid syntax"
 
-def verify_example_rego(example: Dict) -> Tuple[bool, str]:
+    tmpdir = _scratch_dir()
+
+    # Write Rego policy
+    rego_file = tmpdir / "policy.rego"
+    rego_file.write_text(rego_code)
+
+    # Write attestation data as input
+    input_file = tmpdir / "input.json"
+    with open(input_file, 'w') as f:
+        json.dump({"attestation": attestation_data}, f)
+
+    # Compile and evaluate with real data; a separate `opa check` would only
+    # repeat the compile step
+    result = subprocess.run(
+        ['opa', 'eval',
+         '-d', str(rego_file),
+         '-i', str(input_file),
+         'data'],
+        capture_output=True,
+        text=True
+    )
+
+    if result.returncode != 0:
+        return False, _eval_failure(result.stderr)
+
+    # Check if deny rules evaluated (presence indicates it ran)
+    if 'deny' in rego_code and 'data' in result.stdout:
+        try:
+            eval_result = json.loads(result.stdout)
+            # Rego evaluated successfully
+            return True, "Valid - evaluated against real attestation"
+        except:
+            return False, "Could not parse OPA output"
+
+    return True, "Valid syntax"
+
+def verify_example_rego(example: Dict, opa: Optional[OpaServer] = None) -> Tuple[bool, str]:
     """Verify Rego in example against real attestation data"""
     assistant_content = example['messages'][2]['content']
     user_content = example['messages'][1]['content']
 
     # Extract Rego
-    rego_blocks = re.findall(r'```rego\n(.*?)```', assistant_content, re.DOTALL)
+    rego_blocks = list(_iter_fenced(assistant_content, 'rego'))
 
     if not rego_blocks:
         return True, "No Rego to verify"
 
     # Determine attestor from question
-    attestor = None
-    for att in ['git', 'environment', 'commandrun', 'github', 'gitlab', 'aws', 'gcp-iit']:
-        if att in user_content.lower():
-            attestor = att
-            break
+    mentioned = {name.lower() for name in _ATTESTOR_RE.findall(user_content)}
+    attestor = next((att for att in _ATTESTORS if att in mentioned), None)
 
     if not attestor:
         # Can't verify without knowing attestor
         return True, "Skipped - attestor unknown"
 
-    # Create real attestation
-    with tempfile.TemporaryDirectory() as tmpdir:
-        att_file, att_data = create_test_attestation(attestor, Path(tmpdir))
+    # Real attestation, created on first use
+    att_data = attestation_data(attestor)
+
+    if not att_data:
+        return True, f"Skipped - couldn't create {attestor} attestation"
+
+    # Test each Rego block
+    for i, rego in enumerate(rego_blocks, 1):
+        valid, msg = test_rego_against_data(rego, att_data, opa)
+        if not valid:
+            return False, f"Block {i}: {msg}"
 
-        if not att_data:
-            return True, f"Skipped - couldn't create {attestor} attestation"
+    return True, f"Valid - tested against real {attestor} attestation"
 
-        # Test each Rego block
-        for i, rego in enumerate(rego_blocks, 1):
-            valid, msg = test_rego_against_data(rego, att_data)
-            if not valid:
-                return False, f"Block {i}: {msg}"
+# Lines handed to the thread pool at a time; bounds memory while streaming
+BATCH_SIZE = 64
 
-        return True, f"Valid - tested against real {attestor} attestation"
+def _verify_stream(lines, pool, verify):
+    """(line, (valid, msg)) per input line, in input order"""
+    for batch in iter(lambda: list(islice(lines, BATCH_SIZE)), []):
+        yield from zip(batch, pool.map(verify, map(_loads, batch)))
 
 def main():
     # Test the massive schemas file
@@ -179,47 +281,61 @@ def main():
     print(f"Input: {input_file}")
     print()
 
-    with open(input_file, 'r') as f:
-        examples = [json.loads(line) for line in f]
+    # Stream the input: accepted lines are written through unchanged, so only
+    # one batch of examples is held in memory at a time
+    with open(input_file, 'rb') as f:
+        total = sum(1 for _ in f)
 
-    print(f"Total examples: {len(examples)}")
+    print(f"Total examples: {total}")
     print("Testing each Rego policy against real witness attestations...")
     print()
 
-    verified = []
+    verified = 0
     rego_tested = 0
     rego_valid = 0
     rego_invalid = 0
 
-    for i, example in enumerate(examples, 1):
-        if i % 50 == 0:
-            print(f"  Progress: {i}/{len(examples)} (Rego valid: {rego_valid}, invalid: {rego_invalid})")
-
-        valid, msg = verify_example_rego(example)
-
-        if valid:
-            verified.append(example)
-            if "tested against real" in msg:
-                rego_valid += 1
+    # Every check waits on opa (and witness, the first time an attestor comes
+    # up), so threads can run them side by side; results come back in input
+    # order. Policies go to one long-running opa server when it starts, else
+    # the opa CLI.
+    with ExitStack() as stack:
+        try:
+            opa = stack.enter_context(OpaServer())
+        except (OSError, RuntimeError) as e:
+            print(f"  opa server unavailable ({e}), using the opa CLI")
+            opa = None
+
+        fin = stack.enter_context(open(input_file, 'rb'))
+        fout = stack.enter_context(open(output_file, 'wb'))
+        pool = stack.enter_context(ThreadPoolExecutor(max_workers=os.cpu_count()))
+        results = enumerate(_verify_stream(fin, pool, partial(verify_example_rego, opa=opa)), 1)
+        if tqdm is not None:
+            # Rate-limited bar; errors go through tqdm.write so they don't break it
+            results = tqdm(results, total=total, mininterval=0.5, unit='ex')
+        for i, (line, (valid, msg)) in results:
+            if tqdm is None and i % 50 == 0:
+                print(f"  Progress: {i}/{total} (Rego valid: {rego_valid}, invalid: {rego_invalid})")
+
+            if valid:
+                fout.write(line if line.endswith(b'\n') else line + b'\n')
+                verified += 1
+                if "tested against real" in msg:
+                    rego_valid += 1
+                    rego_tested += 1
+            else:
+                rego_invalid += 1
                 rego_tested += 1
-        else:
-            rego_invalid += 1
-            rego_tested += 1
-            if i <= 5:
-                print(f"  ❌ Example {i}: {msg}")
-
-    # Save
-    with open(output_file, 'w') as f:
-        for ex in verified:
-            f.write(json.dumps(ex) + '\n')
+                if i <= 5:
+                    _log(f"  ❌ Example {i}: {msg}")
 
     print()
     print("="*70)
     print(f"✅ Verification Complete!")
     print("="*70)
-    print(f"Total examples: {len(examples)}")
-    print(f"Verified: {len(verified)} ({len(verified)*100/len(examples):.1f}%)")
-    print(f"Rejected: {len(examples) - len(verified)}")
+    print(f"Total examples: {total}")
+    print(f"Verified: {verified} ({verified*100/total:.1f}%)")
+    print(f"Rejected: {total - verified}")
     print()
     print(f"Rego blocks tested: {rego_tested}")
     print(f"Valid (tested with real data): {rego_valid}")
@@ -10,45 +10,115 @@ Usage:
 """
 
 import json
+import mmap
 import sys
 import random
 import argparse
+from collections.abc import Sequence
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+class ExampleIndex(Sequence):
+    """Examples located by byte span in their memory-mapped file
+
+    Only the newline offsets are read up front; a line is parsed when its
+    example is accessed.
+    """
+
+    def __init__(self, files: List[tuple], spans: List[tuple]):
+        self.files = files  # (path, category, filename, mmap) per file
+        self.spans = spans  # (file index, start, end, line number) per example
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ExampleIndex(self.files, self.spans[index])
+
+        file_idx, start, end, line_num = self.spans[index]
+        path, category, filename, mm = self.files[file_idx]
+        try:
+            example = _loads(mm[start:end])
+        except ValueError:
+            print(f"Warning: Invalid JSON at {path}:{line_num}", file=sys.stderr)
+            return None
+
+        example["_meta"] = {
+            "category": category,
+            "file": filename,
+            "line": line_num
+        }
+        return example
+
+    def raw_matches(self, needle: bytes) -> List[int]:
+        """Indices of examples whose undecoded JSON line contains needle
+
+        Case-insensitive for ASCII (needle must be lowercase). Lowering each
+        mapped line and testing with `in` beat both an IGNORECASE regex and
+        lowering whole files at once on data/.
+        """
+        maps = [mm for _, _, _, mm in self.files]
+        return [
+            i for i, (file_idx, start, end, _) in enumerate(self.spans)
+            if needle in maps[file_idx][start:end].lower()
+        ]
+
+    def category(self, index: int) -> str:
+        return self.files[self.spans[index][0]][1]
+
+    def subset(self, indices) -> "ExampleIndex":
+        return ExampleIndex(self.files, [self.spans[i] for i in indices])
 
 
 class ExampleViewer:
     def __init__(self, data_dir: Path):
         self.data_dir = Path(data_dir)
-        self.examples = []
+        self.examples = ExampleIndex([], [])
         self.load_examples()
 
     def load_examples(self):
-        """Load all examples from JSONL files"""
+        """Index all examples in the JSONL files (parsed lazily on access)"""
+        files = []
+        spans = []
         for jsonl_file in sorted(self.data_dir.rglob("*.jsonl")):
-            category = jsonl_file.parent.name
-            filename = jsonl_file.stem
-
-            with open(jsonl_file, 'r') as f:
-                for line_num, line in enumerate(f, 1):
-                    if not line.strip():
-                        continue
-
-                    try:
-                        example = json.loads(line)
-                        example["_meta"] = {
-                            "category": category,
-                            "file": filename,
-                            "line": line_num
-                        }
-                        self.examples.append(example)
-                    except json.JSONDecodeError:
-                        print(f"Warning: Invalid JSON at {jsonl_file}:{line_num}", file=sys.stderr)
-
+            with open(jsonl_file, 'rb') as f:
+                try:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # Empty file
+                    continue
+
+            file_idx = len(files)
+            files.append((jsonl_file, jsonl_file.parent.name, jsonl_file.stem, mm))
+
+            start = 0
+            line_num = 0
+            size = len(mm)
+            while start < size:
+                end = mm.find(b'\n', start)
+                if end == -1:
+                    end = size
+                line_num += 1
+                if mm[start:end].strip():
+                    spans.append((file_idx, start, end, line_num))
+                start = end + 1
+
+        self.examples = ExampleIndex(files, spans)
         print(f"Loaded {len(self.examples)} examples\n")
 
-    def display_example(self, example: Dict, index: int = None):
+    def display_example(self, example: Optional[Dict], index: int = None):
         """Display a single example in readable format"""
+        if example is None:
+            return
+
         meta = example["_meta"]
 
         print("=" * 80)
@@ -77,30 +147,42 @@ class ExampleViewer:
 
         print("\n" + "=" * 80 + "\n")
 
-    def filter_by_category(self, category: str) -> List[Dict]:
+    def filter_by_category(self, category: str) -> ExampleIndex:
         """Filter examples by category"""
-        return [ex for ex in self.examples if ex["_meta"]["category"] == category]
+        examples = self.examples
+        return examples.subset(i for i in range(len(examples)) if examples.category(i) == category)
 
-    def search(self, query: str) -> List[Dict]:
+    def search(self, query: str) -> ExampleIndex:
         """Search examples by query string"""
         query_lower = query.lower()
-        results = []
+        examples = self.examples
+
+        # A plain ASCII query shows up verbatim in the raw JSON line whenever
+        # it is in a message, so lines without it needn't be parsed
+        candidates = range(len(examples))
+        if query_lower.isascii() and json.dumps(query_lower)[1:-1] == query_lower:
+            candidates = examples.raw_matches(query_lower.encode())
+
+        matches = []
+        for i in candidates:
+            ex = examples[i]
+            if ex is None:
+                continue
 
-        for ex in self.examples:
             # Search in user and assistant messages
             user_content = ex["messages"][1]["content"].lower()
             assistant_content = ex["messages"][2]["content"].lower()
 
             if query_lower in user_content or query_lower in assistant_content:
-                results.append(ex)
+                matches.append(i)
 
-        return results
+        return examples.subset(matches)
 
     def show_stats(self):
         """Display dataset statistics"""
         categories = {}
-        for ex in self.examples:
-            cat = ex["_meta"]["category"]
+        for i in range(len(self.examples)):
+            cat = self.examples.category(i)
             categories[cat] = categories.get(cat, 0) + 1
 
         print("Dataset Statistics")
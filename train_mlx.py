@@ -6,86 +6,105 @@ MLX is Apple's machine learning framework optimized for Apple Silicon.
 It's much faster than PyTorch on M1/M2/M3 Macs.
 
 Installation:
-    pip3 install mlx mlx-lm transformers datasets
+    pip3 install mlx "mlx-lm>=0.24.1,<0.33" transformers datasets
+
+Training calls mlx_lm.tuner.train in-process with its own pre-tokenized
+batches and loss, using the tokenizer-free train() API of mlx-lm 0.24.1+.
 
 Usage:
     python3 train_mlx.py
 """
 
+import importlib.util
 import json
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Multi-connection Rust downloader for the first download; huggingface_hub
+# reads the flag at import and refuses it without hf_transfer installed
+if importlib.util.find_spec("hf_transfer") is not None:
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
 try:
     import mlx.core as mx
-    from mlx_lm import load, generate
-    from mlx_lm.tuner import train as mlx_train
-    from mlx_lm.tuner.utils import build_schedule
+    import mlx.nn as nn
+    import mlx.optimizers as optim
+    import numpy as np
+    from mlx_lm import convert, load, generate
+    from mlx_lm.tuner import TrainingArgs, train as mlx_train
+    from mlx_lm.tuner.utils import build_schedule, linear_to_lora_layers
 except ImportError:
     print("❌ MLX not installed!")
-    print("\nInstall with: pip3 install mlx mlx-lm transformers datasets")
+    print("\nInstall with: pip3 install mlx \"mlx-lm>=0.24.1,<0.33\" transformers datasets")
     exit(1)
 
 # Configuration
-MODEL_NAME = "mlx-community/Llama-3.2-3B-Instruct-4bit"  # Pre-quantized for speed
+BASE_MODEL = "unsloth/Llama-3.2-3B-Instruct"
+# 4-bit with group size 32 (mlx-community's builds use 64); converted from
+# BASE_MODEL on the first run
+MODEL_NAME = "./mlx-models/Llama-3.2-3B-Instruct-4bit-gs32"
+Q_GROUP_SIZE = 32
 OUTPUT_DIR = "./witness-llama-3.2-3b-lora-mlx"
 DATA_DIR = Path("./data")
 
-print("=" * 80)
-print("🍎 Witness Expert Model Fine-Tuning (MLX)")
-print("=" * 80)
-print(f"Base Model: {MODEL_NAME}")
-print(f"Output: {OUTPUT_DIR}")
-print(f"Device: Apple Silicon (MLX)")
-print("=" * 80)
-
-# Step 1: Convert JSONL to MLX format
+print("\n".join([
+    "=" * 80,
+    "🍎 Witness Expert Model Fine-Tuning (MLX)",
+    "=" * 80,
+    f"Base Model: {MODEL_NAME}",
+    f"Output: {OUTPUT_DIR}",
+    f"Device: Apple Silicon (MLX)",
+    "=" * 80,
+]), flush=True)
+
+def load_model():
+    """Load MODEL_NAME, quantizing BASE_MODEL into it first if it doesn't exist yet"""
+    if not Path(MODEL_NAME).exists():
+        convert(BASE_MODEL, mlx_path=MODEL_NAME, quantize=True, q_group_size=Q_GROUP_SIZE, q_bits=4)
+    return load(MODEL_NAME)
+
+# Download/map the model weights in the background while the data is
+# prepared; loading is I/O-bound, so the two overlap
+_loader = ThreadPoolExecutor(max_workers=1)
+model_future = _loader.submit(load_model)
+
+# Step 1: Load training data
 print("\n📚 Preparing training data...")
 
 def load_jsonl(file_path):
     """Load JSONL file"""
-    with open(file_path, 'r') as f:
-        return [json.loads(line) for line in f]
-
-def convert_to_mlx_format(examples):
-    """Convert examples to MLX chat format"""
-    converted = []
-    for ex in examples:
-        # MLX expects {"messages": [...]} format
-        converted.append({"messages": ex["messages"]})
-    return converted
+    return [_loads(line) for line in Path(file_path).read_bytes().splitlines() if line]
 
-# Load and convert
-train_data = load_jsonl(DATA_DIR / "train.jsonl")
-val_data = load_jsonl(DATA_DIR / "val.jsonl")
+# Training reads the "messages" of these examples straight from memory (see
+# tokenize_chats), so no MLX-format copy of the files is written
+train_path = DATA_DIR / "train.jsonl"
+val_path = DATA_DIR / "val.jsonl"
+train_data = load_jsonl(train_path)
+val_data = load_jsonl(val_path)
 
 print(f"  Train: {len(train_data)} examples")
 print(f"  Val: {len(val_data)} examples")
 
-# Save in MLX format
-mlx_train_path = DATA_DIR / "train_mlx.jsonl"
-mlx_val_path = DATA_DIR / "val_mlx.jsonl"
-
-with open(mlx_train_path, 'w') as f:
-    for ex in convert_to_mlx_format(train_data):
-        f.write(json.dumps(ex) + '\n')
-
-with open(mlx_val_path, 'w') as f:
-    for ex in convert_to_mlx_format(val_data):
-        f.write(json.dumps(ex) + '\n')
-
-print(f"  ✓ Converted to MLX format")
-
 # Step 2: Configure training parameters
 print("\n⚙️  Training Configuration:")
 
 config = {
     "model": MODEL_NAME,
     "train": True,
-    "data": str(mlx_train_path),
-    "valid_data": str(mlx_val_path),
-    "lora_layers": 16,  # Number of layers to apply LoRA
-    "batch_size": 2,
+    "data": str(train_path),
+    "valid_data": str(val_path),
+    "fine_tune_type": "lora",
+    "num_layers": 16,  # Number of layers to apply LoRA
+    "batch_size": 4,
+    "grad_checkpoint": True,  # Recompute activations to make room for the larger batch
     "iters": 100,  # Number of training iterations
     "steps_per_eval": 20,
     "val_batches": 5,
@@ -97,72 +116,112 @@ config = {
     "max_seq_length": 2048,
 }
 
+LORA_PARAMETERS = {"rank": 16, "alpha": 16, "dropout": 0.0, "scale": 10.0}
+
 for key, value in config.items():
     if key not in ["model", "data", "valid_data", "adapter_path"]:
         print(f"  {key}: {value}")
 
 # Step 3: Run training
-print("\n" + "=" * 80)
-print("🚀 Starting MLX fine-tuning...")
-print("=" * 80)
-print("\nThis will:")
-print("  1. Download Llama 3.2 3B (4-bit quantized) if needed")
-print("  2. Apply LoRA adapters to the model")
-print("  3. Fine-tune on 17 training examples")
-print("  4. Validate on 5 examples")
-print("  5. Save adapters to", OUTPUT_DIR)
-print("\nEstimated time: 5-15 minutes (depending on your Mac)")
-print("=" * 80)
+print("\n".join([
+    "\n" + "=" * 80,
+    "🚀 Starting MLX fine-tuning...",
+    "=" * 80,
+    "\nThis will:",
+    "  1. Download and quantize Llama 3.2 3B (4-bit, group size 32) if needed",
+    "  2. Apply LoRA adapters to the model",
+    "  3. Fine-tune on 17 training examples",
+    "  4. Validate on 5 examples",
+    f"  5. Save adapters to {OUTPUT_DIR}",
+    "\nEstimated time: 5-15 minutes (depending on your Mac)",
+    "=" * 80,
+]), flush=True)
+
+def tokenize_chats(examples, tokenizer):
+    """Token ids of each example, rendered with the model's chat template once up front"""
+    return [tokenizer.apply_chat_template(ex["messages"], tokenize=True) for ex in examples]
+
+def iterate_batches(dataset, batch_size, max_seq_length, train=False, loop=False, **kwargs):
+    """(inputs, targets, lengths) batches of pre-tokenized examples
+
+    Examples are grouped by length to keep padding small; training loops
+    over the batches in random order forever, evaluation goes through once.
+    Older mlx-lm asks for the training loop with train=True and newer
+    releases with loop=True, so either one turns it on.
+    """
+    loop = loop or train
+    if len(dataset) < batch_size:
+        raise ValueError(f"Dataset must have at least batch_size={batch_size} examples")
+    order = sorted(range(len(dataset)), key=lambda i: len(dataset[i]))
+    batches = [order[i:i + batch_size] for i in range(0, len(order) - batch_size + 1, batch_size)]
+
+    while True:
+        for b in (np.random.permutation(len(batches)) if loop else range(len(batches))):
+            seqs = [dataset[j][:max_seq_length] for j in batches[b]]
+            tokens = np.zeros((batch_size, max(map(len, seqs))), np.int32)
+            for row, seq in enumerate(seqs):
+                tokens[row, :len(seq)] = seq
+            tokens = mx.array(tokens)
+            yield tokens[:, :-1], tokens[:, 1:], mx.array([len(seq) - 1 for seq in seqs])
+        if not loop:
+            break
+
+def chat_loss(model, inputs, targets, lengths):
+    """Mean next-token cross entropy over the unpadded positions, and their count"""
+    logits = model(inputs)
+    mask = mx.arange(inputs.shape[1])[None, :] < lengths[:, None]
+    ntoks = mask.sum()
+    loss = (nn.losses.cross_entropy(logits, targets) * mask).sum() / ntoks
+    return loss, ntoks
 
 start_time = time.time()
 
-try:
-    # Note: mlx_train expects command-line style arguments
-    # We'll need to use the CLI instead
-    print("\n⚠️  Please run the following command instead:\n")
-
-    cmd = f"""mlx_lm.lora \\
-  --model {MODEL_NAME} \\
-  --train \\
-  --data {mlx_train_path} \\
-  --valid-data {mlx_val_path} \\
-  --lora-layers 16 \\
-  --batch-size 2 \\
-  --iters 100 \\
-  --steps-per-eval 20 \\
-  --learning-rate 2e-5 \\
-  --adapter-path {OUTPUT_DIR} \\
-  --save-every 50 \\
-  --max-seq-length 2048"""
-
-    print(cmd)
-    print("\nOr use the wrapper script: ./train_mlx.sh\n")
-
-    # Create wrapper script
-    with open("train_mlx.sh", "w") as f:
-        f.write("#!/bin/bash\n\n")
-        f.write("# MLX fine-tuning script for Witness Expert Model\n\n")
-        f.write(cmd + "\n")
-
-    import os
-    os.chmod("train_mlx.sh", 0o755)
-
-    print("✓ Created train_mlx.sh wrapper script")
-
-except Exception as e:
-    print(f"\n❌ Error: {e}")
-    print("\nFalling back to CLI command...")
+# Train in this process: the model is loaded once and the training step
+# stays one lazily evaluated MLX graph, instead of spawning mlx_lm.lora
+model, tokenizer = model_future.result()
+_loader.shutdown()
+
+model.freeze()
+linear_to_lora_layers(model, config["num_layers"], LORA_PARAMETERS)
+
+adapter_path = Path(OUTPUT_DIR)
+adapter_path.mkdir(parents=True, exist_ok=True)
+# Same keys mlx_lm.lora writes, which load_adapters (--adapter-path) reads back
+with open(adapter_path / "adapter_config.json", "w") as f:
+    json.dump({**config, "lora_parameters": LORA_PARAMETERS}, f, indent=4)
+
+training_args = TrainingArgs(
+    batch_size=config["batch_size"],
+    iters=config["iters"],
+    val_batches=config["val_batches"],
+    steps_per_eval=config["steps_per_eval"],
+    steps_per_save=config["save_every"],
+    adapter_file=adapter_path / "adapters.safetensors",
+    max_seq_length=config["max_seq_length"],
+    grad_checkpoint=config["grad_checkpoint"],
+)
+
+mlx_train(
+    model=model,
+    optimizer=optim.Adam(learning_rate=config["learning_rate"]),
+    train_dataset=tokenize_chats(train_data, tokenizer),
+    val_dataset=tokenize_chats(val_data, tokenizer),
+    args=training_args,
+    loss=chat_loss,
+    iterate_batches=iterate_batches,
+)
 
 elapsed = time.time() - start_time
 
-print("\n" + "=" * 80)
-print("📝 Next Steps:")
-print("=" * 80)
-print("\n1. Install MLX if not already:")
-print("   pip3 install mlx mlx-lm")
-print("\n2. Run the training script:")
-print("   ./train_mlx.sh")
-print("\n3. Or use the mlx_lm command directly (see above)")
-print("\n4. Test the model:")
-print("   python3 test_mlx_model.py")
-print("\n" + "=" * 80)
+print("\n".join([
+    "\n" + "=" * 80,
+    f"✅ Training complete in {elapsed / 60:.1f} minutes",
+    "=" * 80,
+    f"\nAdapters saved to: {OUTPUT_DIR}",
+    "\n📝 Next Steps:",
+    "\n1. Test the model:",
+    "   python3 test_mlx_model.py",
+    "\n2. Or generate with the adapters directly:",
+    f"   mlx_lm.generate --model {MODEL_NAME} --adapter-path {OUTPUT_DIR} --prompt \"...\"",
+    "\n" + "=" * 80,
+]), flush=True)